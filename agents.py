@@ -1,100 +1,433 @@
+import json
 import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from autogen import AssistantAgent
 from dotenv import load_dotenv
+from utils.llm_cache import LLMResponseCache
+from utils.llm_scheduler import BACKGROUND, INTERACTIVE, get_shared_scheduler, is_retryable_error
+from utils.conversation import paper_context_prefix
+from utils.llm_stream import GroqStreamClient
+from utils.metrics import metrics
+from utils.prompt_packing import batch_sections, count_tokens, pack_sections, plan_batches, truncate_to_tokens
 
 # Load environment variables
 load_dotenv()
 
+# Most abstracts packed into one batched summarization request, bounded by the reply length
+MAX_SUMMARY_BATCH = 10
+
+# Completion tokens reserved per request when charging the scheduler's tokens-per-minute budget
+COMPLETION_TOKEN_RESERVE = 512
+
+# Shown in place of a paper field whose agent call failed; never stored as a result
+FALLBACK_TEXT = {
+    "summary": "Summarization failed!",
+    "advantages_disadvantages": "Advantages and disadvantages analysis failed!",
+    "visualization": "No visualization suggestion found.",
+}
+
+
+def without_fallbacks(record):
+    """Returns a copy of a stored paper record with fallback text (from older runs) cleared."""
+    return {key: None if FALLBACK_TEXT.get(key) == value else value for key, value in record.items()}
+
+
+def with_fallbacks(paper):
+    """Returns a copy of a processed paper for display: missing fields get their fallback text
+    and the paper is marked "incomplete"."""
+    missing = [field for field in FALLBACK_TEXT if not paper.get(field)]
+    if not missing:
+        return paper
+    return {**paper, **{field: FALLBACK_TEXT[field] for field in missing}, "incomplete": True}
+
+
+def or_default(fn, default):
+    """
+    Wraps an agent call so that a failed request (scheduler retries used up, or an error that
+    is not retried) returns `default` instead of raising, letting the other papers carry on.
+    """
+    def call(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            metrics.increment("agent_call_errors")
+            print(f"Agent call failed: {type(e).__name__}: {e}")
+            return default
+    return call
+
+
+def parse_json_object(text):
+    """Extracts the first JSON object from an LLM reply, tolerating code fences and surrounding prose."""
+    text = re.sub(r"```(?:json)?", "", text or "")
+    start, end = text.find("{"), text.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        parsed = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    return parsed if isinstance(parsed, dict) else None
+
+
 class ResearchAgents:
-    def __init__(self, api_key):
+    def __init__(self, api_key, max_workers=4, cache=None, stream_client=None, prompt_budget=6000, scheduler=None,
+                 agent_cls=AssistantAgent, agent_kwargs=None):
         self.groq_api_key = api_key
+        self.max_workers = max_workers  # Upper bound on concurrent LLM calls in process_papers
+        self.prompt_budget = prompt_budget  # Tokens of paper material allowed in one multi-paper prompt
+        # Shared response cache for every agent call; pass cache=False to disable it
+        self.cache = LLMResponseCache() if cache is None else cache
+        # Process-wide rate-limit scheduler shared with every page and the DataLoader
+        self.scheduler = scheduler or get_shared_scheduler()
         self.llm_config = {'config_list': [{'model': 'llama-3.3-70b-versatile', 'api_key': self.groq_api_key, 'api_type': "groq"}]}
+        # Token-streaming backend used by stream_agent (pass utils.mock_llm.MockLLM() to run offline)
+        self.stream_client = stream_client or GroqStreamClient(self.groq_api_key, model=self.llm_config['config_list'][0]['model'])
+        # Agent class and extra constructor arguments (utils.mock_llm.MockAssistantAgent runs offline)
+        agent_kwargs = agent_kwargs or {}
 
         # Summarizer Agent - Summarizes research papers
-        self.summarizer_agent = AssistantAgent(
+        self.summarizer_agent = agent_cls(
             name="summarizer_agent",
             system_message="Summarize the retrieved research papers and present concise summaries to the user, JUST GIVE THE RELEVANT SUMMARIES OF THE RESEARCH PAPER AND NOT YOUR THOUGHT PROCESS.",
             llm_config=self.llm_config,
             human_input_mode="NEVER",
-            code_execution_config=False
+            code_execution_config=False,
+            **agent_kwargs
         )
 
         # Advantages and Disadvantages Agent - Analyzes pros and cons
-        self.advantages_disadvantages_agent = AssistantAgent(
+        self.advantages_disadvantages_agent = agent_cls(
             name="advantages_disadvantages_agent",
             system_message="Analyze the summaries of the research papers and provide a list of advantages and disadvantages for each paper in a pointwise format. JUST GIVE THE ADVANTAGES AND DISADVANTAGES, NOT YOUR THOUGHT PROCESS",
             llm_config=self.llm_config,
             human_input_mode="NEVER",
-            code_execution_config=False
+            code_execution_config=False,
+            **agent_kwargs
         )
 
-        self.visualization_agent = AssistantAgent(
+        self.visualization_agent = agent_cls(
             name="visualization_agent",
             system_message="Based on this research paper's content, describe a visualization (like a chart, graph, or keyword map) that would help users understand the key ideas. Output a Python matplotlib/seaborn code snippet or a clear description of the visualization. Avoid assumptions and hallucinations.",
             llm_config=self.llm_config,
             human_input_mode="NEVER",
-            code_execution_config=False  # We'll execute the code in Streamlit
+            code_execution_config=False,  # We'll execute the code in Streamlit
+            **agent_kwargs
         )
         
-    def summarize_paper(self, paper_summary):
-        """Generates a summary of the research paper."""
-        summary_response = self.summarizer_agent.generate_reply(
-            messages=[{"role": "user", "content": f"Summarize this paper: {paper_summary}"}]
-        )
-        return summary_response.get("content", "Summarization failed!") if isinstance(summary_response, dict) else str(summary_response)
+    def _cache_key(self, agent, messages):
+        model = agent.llm_config["config_list"][0]["model"] if agent.llm_config else None
+        return LLMResponseCache.make_key(agent.name, agent.system_message, model, messages)
+
+    @staticmethod
+    def _prompt_tokens(agent, content):
+        return count_tokens(agent.system_message or "") + count_tokens(content)
+
+    def _cached_reply(self, key):
+        if not self.cache:
+            return None
+        cached = self.cache.get(key)
+        metrics.increment("llm_cache_hits" if cached is not None else "llm_cache_misses")
+        return cached
+
+    def ask_agent(self, agent, content, default="", priority=INTERACTIVE):
+        """
+        Sends a single user message to `agent` and returns the reply text, or `default` for an empty reply.
+        Replies are served from the response cache when the same agent, model and prompt were seen before;
+        otherwise the request goes through the scheduler, which applies rate limits, `priority` and retries.
+        A request that still fails raises; wrap the call with or_default where a failure should not propagate.
+        """
+        messages = [{"role": "user", "content": content}]
+        key = self._cache_key(agent, messages)
+        cached = self._cached_reply(key)
+        if cached is not None:
+            return cached
+
+        prompt_tokens = self._prompt_tokens(agent, content)
+        with metrics.span(f"llm:{agent.name}"):
+            response = self.scheduler.call(
+                lambda: agent.generate_reply(messages=messages),
+                tokens=prompt_tokens + COMPLETION_TOKEN_RESERVE,
+                priority=priority,
+                key=key,
+            )
+        reply = response.get("content") if isinstance(response, dict) else response
+        metrics.increment("prompt_tokens", prompt_tokens)
+        if not reply:
+            return default
+
+        reply = str(reply)
+        metrics.increment("completion_tokens", count_tokens(reply))
+        if self.cache:
+            self.cache.set(key, reply)
+        return reply
+
+    def stream_agent(self, agent, content, default="", priority=INTERACTIVE):
+        """
+        Like ask_agent, but yields the reply in chunks as the model produces them.
+        Cached replies are yielded in one piece; completed streams are written to the cache.
+        A stream that fails before its first chunk is retried with the scheduler's backoff.
+        """
+        messages = [{"role": "user", "content": content}]
+        key = self._cache_key(agent, messages)
+        cached = self._cached_reply(key)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        prompt_tokens = self._prompt_tokens(agent, content)
+        start = time.perf_counter()
+        for attempt in range(self.scheduler.max_retries + 1):
+            self.scheduler.acquire(prompt_tokens + COMPLETION_TOKEN_RESERVE, priority)
+            try:
+                for chunk in self.stream_client.stream(agent.system_message, messages):
+                    if not chunks:
+                        metrics.observe(f"llm_first_token:{agent.name}", time.perf_counter() - start)
+                    chunks.append(chunk)
+                    yield chunk
+                break
+            except Exception as e:
+                if chunks or attempt == self.scheduler.max_retries or not is_retryable_error(e):
+                    raise
+                time.sleep(self.scheduler.backoff(attempt))
+        metrics.observe(f"llm_stream:{agent.name}", time.perf_counter() - start)
 
-    def analyze_advantages_disadvantages(self, summary):
+        reply = "".join(chunks)
+        metrics.increment("prompt_tokens", prompt_tokens)
+        if not reply:
+            yield default
+        else:
+            metrics.increment("completion_tokens", count_tokens(reply))
+            if self.cache:
+                self.cache.set(key, reply)
+
+    def summarize_paper(self, paper_summary, default=FALLBACK_TEXT["summary"]):
+        """Generates a summary of the research paper (`default` if the request fails)."""
+        return self.ask_agent(self.summarizer_agent, f"Summarize this paper: {paper_summary}", default, priority=BACKGROUND)
+
+    def analyze_advantages_disadvantages(self, summary, default=FALLBACK_TEXT["advantages_disadvantages"]):
         """Generates advantages and disadvantages of the research paper."""
-        adv_dis_response = self.advantages_disadvantages_agent.generate_reply(
-            messages=[{"role": "user", "content": f"Provide advantages and disadvantages for this paper: {summary}"}]
+        return self.ask_agent(
+            self.advantages_disadvantages_agent,
+            f"Provide advantages and disadvantages for this paper: {summary}",
+            default,
+            priority=BACKGROUND,
         )
-        return adv_dis_response.get("content", "Advantages and disadvantages analysis failed!")
     
-    def generate_visualization(self, paper_summary):
+    def generate_visualization(self, paper_summary, default=FALLBACK_TEXT["visualization"]):
         """Ask the agent to propose a visualization based on the summary."""
-        vis_response = self.visualization_agent.generate_reply(
-            messages=[{"role": "user", "content": f"What kind of visualization can represent this paper: {paper_summary}"}]
+        return self.ask_agent(
+            self.visualization_agent,
+            f"What kind of visualization can represent this paper: {paper_summary}",
+            default,
+            priority=BACKGROUND,
         )
-        return vis_response.get("content", "No visualization suggestion found.")
-    
-    def ask_question(self, paper_summary, question):
+
+    def summarize_papers(self, paper_summaries, batch_size=None, default=FALLBACK_TEXT["summary"]):
+        """
+        Summarizes several abstracts with one request per batch instead of one per paper.
+        Each batch asks for a JSON object keyed by paper id; papers missing from the parsed
+        reply (or whose batch request failed) fall back to summarize_paper, and papers that
+        still fail get `default`.
+        Without `batch_size`, batches are sized to fit the prompt budget.
+
+        Returns:
+            list: Summaries in the same order as `paper_summaries`.
+        """
+        sections = [f"[p{i + 1}]\n{abstract}" for i, abstract in enumerate(paper_summaries)]
+        if batch_size:
+            batches = [list(range(i, min(i + batch_size, len(sections)))) for i in range(0, len(sections), batch_size)]
+        else:
+            batches = plan_batches(sections, self.prompt_budget, max_items=MAX_SUMMARY_BATCH)
+
+        def summarize_batch(batch):
+            if len(batch) == 1:
+                return {batch[0]: or_default(self.summarize_paper, default)(paper_summaries[batch[0]], default)}
+            prompt = (
+                "Summarize each of the following papers. Return ONLY a JSON object that maps each paper id "
+                'to its summary, for example {"p1": "...", "p2": "..."}.\n\n'
+                + "\n\n".join(sections[i] for i in batch)
+            )
+            reply = or_default(self.ask_agent, None)(self.summarizer_agent, prompt, priority=BACKGROUND)
+            parsed = parse_json_object(reply) or {}
+            return {
+                i: parsed[f"p{i + 1}"] for i in batch
+                if isinstance(parsed.get(f"p{i + 1}"), str) and parsed[f"p{i + 1}"].strip()
+            }
+
+        summaries = [None] * len(paper_summaries)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for result in pool.map(metrics.in_trace(summarize_batch), batches):
+                for i, summary in result.items():
+                    summaries[i] = summary
+            missing = [i for i, summary in enumerate(summaries) if summary is None]
+            summarize = or_default(self.summarize_paper, default)
+            for i, summary in zip(missing, pool.map(metrics.in_trace(lambda i: summarize(paper_summaries[i], default)), missing)):
+                summaries[i] = summary
+        return summaries
+
+    def process_papers(self, papers, max_workers=None, batch_summaries=False, fallback_text=True, on_paper_done=None):
+        """
+        Summarizes every paper concurrently and, as soon as a summary is ready, runs the
+        advantages/disadvantages and visualization agents for it in parallel.
+        With `batch_summaries`, the summaries come from batched requests (see summarize_papers).
+        A failed agent call (empty reply or request error) only affects its own field: with
+        `fallback_text=False` the field is None instead of the FALLBACK_TEXT message (and a
+        paper without a summary is not analyzed further), so callers that store results can
+        tell failures apart.
+        `on_paper_done(i, paper)` is called on the calling thread as soon as paper `i` is fully
+        processed; if it raises, unstarted agent calls are cancelled and the error propagates.
+
+        Returns:
+            list: Processed paper dictionaries in the same order as `papers`.
+        """
+        defaults = FALLBACK_TEXT if fallback_text else dict.fromkeys(FALLBACK_TEXT)
+        processed = [None] * len(papers)
+        remaining = [0] * len(papers)  # Agent stages still running per paper
+        with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as pool:
+            stage_futures = {}
+
+            def finish(i):
+                if on_paper_done is not None:
+                    on_paper_done(i, processed[i])
+
+            def start_stages(i, summary):
+                processed[i] = {
+                    "title": papers[i]["title"],
+                    "link": papers[i]["link"],
+                    "summary": summary,
+                    "advantages_disadvantages": None,
+                    "visualization": None,
+                }
+                if summary is None:
+                    finish(i)
+                    return
+                remaining[i] = 2
+                for field, stage in (("advantages_disadvantages", self.analyze_advantages_disadvantages),
+                                     ("visualization", self.generate_visualization)):
+                    stage = or_default(stage, defaults[field])
+                    stage_futures[pool.submit(metrics.in_trace(stage), summary, defaults[field])] = (i, field)
+
+            summary_futures = {}
+            try:
+                if batch_summaries:
+                    summaries = self.summarize_papers([paper["summary"] for paper in papers], default=defaults["summary"])
+                    for i, summary in enumerate(summaries):
+                        start_stages(i, summary)
+                else:
+                    summary_futures = {
+                        pool.submit(metrics.in_trace(or_default(self.summarize_paper, defaults["summary"])),
+                                    paper["summary"], defaults["summary"]): i
+                        for i, paper in enumerate(papers)
+                    }
+                    for future in as_completed(summary_futures):
+                        start_stages(summary_futures[future], future.result())
+
+                for future in as_completed(stage_futures):
+                    i, field = stage_futures[future]
+                    processed[i][field] = future.result()
+                    remaining[i] -= 1
+                    if not remaining[i]:
+                        finish(i)
+            except BaseException:
+                for future in [*summary_futures, *stage_futures]:
+                    future.cancel()
+                raise
+        return processed
+
+    def ask_question(self, paper_summary, question, memory=None):
         """
         Uses the summarizer_agent to answer questions based on the paper summary.
+        Pass a utils.conversation.ConversationMemory to include earlier turns of the chat.
         """
-        response = self.summarizer_agent.generate_reply(
-            messages=[
-                {"role": "user", "content": f"Based on this paper:\n\n{paper_summary}\n\nAnswer this question:\n{question}"}
-            ]
-        )
-        return response.get("content", "No answer generated.")
-    # Add this inside ResearchAgents class
-    def recommend_citations(self, thesis_topic, papers):
-        summaries = "\n\n".join([f"Title: {p['title']}\nSummary: {p['summary']}" for p in papers])
+        return self.ask_agent(self.summarizer_agent, self._question_prompt(paper_summary, question, memory), "No answer generated.")
+
+    def stream_question(self, paper_summary, question, memory=None):
+        """Streaming variant of ask_question."""
+        return self.stream_agent(self.summarizer_agent, self._question_prompt(paper_summary, question, memory), "No answer generated.")
+
+    @staticmethod
+    def _question_prompt(paper_summary, question, memory=None):
+        history = memory.render() if memory is not None else ""
+        return f"{paper_context_prefix(paper_summary)}{history}Answer this question:\n{question}"
+
+    def compress_history(self, previous_summary, turns, max_words=150):
+        """Folds chat turns into a rolling summary; used by ConversationMemory.compact."""
+        transcript = "\n".join(f"{role.capitalize()}: {content}" for role, content in turns)
         prompt = (
-            f"I'm writing a thesis on: '{thesis_topic}'.\n"
-            f"Here are some research papers:\n\n{summaries}\n\n"
-            "Please recommend which papers are best suited as citations for this thesis topic, "
-            "based on their relevance, clarity of methodology, and impact. "
-            "For each recommended paper, explain in 2-3 lines why it's useful to cite."
+            f"Summary of the conversation so far:\n{previous_summary or '(none)'}\n\n"
+            f"New turns:\n{transcript}\n\n"
+            f"Update the summary to cover the new turns in at most {max_words} words. "
+            "Keep facts, questions asked and conclusions reached. Return only the summary."
         )
+        return self.ask_agent(self.summarizer_agent, prompt, previous_summary)
+
+    def _ask_packed(self, agent, sections, build_prompt, build_reduce_prompt, default):
+        """
+        Sends one section per paper in a single prompt trimmed to the token budget. When the
+        sections cannot fit even trimmed, build_prompt is mapped over batches concurrently and
+        the partial answers are combined with build_reduce_prompt.
+        """
+        packed = pack_sections(sections, self.prompt_budget)
+        if packed is not None:
+            return self.ask_agent(agent, build_prompt("\n\n".join(packed)), default)
+
+        batches = batch_sections(sections, self.prompt_budget)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            partials = list(pool.map(metrics.in_trace(lambda batch: self.ask_agent(agent, build_prompt("\n\n".join(batch)))), batches))
+        partials = [partial for partial in partials if partial]
+        if not partials:
+            return default
+
+        combined = pack_sections(partials, self.prompt_budget) or [
+            truncate_to_tokens(partial, self.prompt_budget // len(partials)) for partial in partials
+        ]
+        return self.ask_agent(agent, build_reduce_prompt("\n\n---\n\n".join(combined)), default)
+
+    def recommend_citations(self, thesis_topic, papers):
+        sections = [f"Title: {p['title']}\nSummary: {p['summary']}" for p in papers]
+
+        def build_prompt(summaries):
+            return (
+                f"I'm writing a thesis on: '{thesis_topic}'.\n"
+                f"Here are some research papers:\n\n{summaries}\n\n"
+                "Please recommend which papers are best suited as citations for this thesis topic, "
+                "based on their relevance, clarity of methodology, and impact. "
+                "For each recommended paper, explain in 2-3 lines why it's useful to cite."
+            )
+
+        def build_reduce_prompt(recommendations):
+            return (
+                f"I'm writing a thesis on: '{thesis_topic}'.\n"
+                f"Below are citation recommendations made for separate batches of papers:\n\n{recommendations}\n\n"
+                "Merge them into one list of the papers best suited as citations, keeping for each "
+                "recommended paper 2-3 lines on why it's useful to cite."
+            )
+
+        return self._ask_packed(self.summarizer_agent, sections, build_prompt, build_reduce_prompt, "Citation recommendation failed.")
 
-        response = self.summarizer_agent.generate_reply(
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.get("content", "Citation recommendation failed.")
     def compare_papers(self, selected_papers):
-        summaries = "\n\n".join([
+        sections = [
             f"Title: {p['title']}\nSummary: {p['summary']}\nAdvantages and Disadvantages: {p['advantages_disadvantages']}"
             for p in selected_papers
-        ])
-        prompt = (
-            f"Compare the following papers side-by-side.\n\n{summaries}\n\n"
-            "Return a markdown-formatted table comparing:\n"
-            "- Methodology\n- Dataset Used\n- Accuracy (if any)\n- Pros & Cons\n"
-            "Then provide a short paragraph summarizing which paper is better and why."
-        )
+        ]
 
-        response = self.advantages_disadvantages_agent.generate_reply(
-            messages=[{"role": "user", "content": prompt}]
-        )
-        return response.get("content", "Comparison failed.")
+        def build_prompt(summaries):
+            return (
+                f"Compare the following papers side-by-side.\n\n{summaries}\n\n"
+                "Return a markdown-formatted table comparing:\n"
+                "- Methodology\n- Dataset Used\n- Accuracy (if any)\n- Pros & Cons\n"
+                "Then provide a short paragraph summarizing which paper is better and why."
+            )
+
+        def build_reduce_prompt(comparisons):
+            return (
+                f"Below are side-by-side comparisons of separate batches of papers:\n\n{comparisons}\n\n"
+                "Merge them into a single markdown-formatted table comparing:\n"
+                "- Methodology\n- Dataset Used\n- Accuracy (if any)\n- Pros & Cons\n"
+                "Then provide a short paragraph summarizing which paper is better and why."
+            )
+
+        return self._ask_packed(self.advantages_disadvantages_agent, sections, build_prompt, build_reduce_prompt, "Comparison failed.")
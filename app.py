@@ -1,10 +1,13 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from agents import ResearchAgents
-from data_loader import DataLoader
-import urllib.parse
-from utils.graph_builder import build_keyword_graph, visualize_graph_pyvis
+from data_loader import PAPER_SOURCES, paper_id
+from resources import get_research_agents, get_paper_handles, get_job_queue, get_visualization_renderer
+from utils.job_queue import ACTIVE_STATUSES, DONE
+from utils.graph_builder import KeywordGraphIndex, visualize_graph_pyvis
+from utils.role_panel import RolePanel
+from utils.ui import remember_papers, render_chart, render_job_progress, render_metrics_sidebar
+from utils.viz_sandbox import extract_code
 
 
 
@@ -59,7 +62,7 @@ st.markdown(custom_css, unsafe_allow_html=True)
 st.title("📚 ReGenAI- MultiAgent Sytem for Intelligent Research")
 
 num_results = 5
-source_choice = st.sidebar.multiselect("Select Data Sources", options=["ArXiv", "Google Scholar"], default=["ArXiv"])
+source_choice = st.sidebar.multiselect("Select Data Sources", options=list(PAPER_SOURCES), default=["ArXiv"])
 # Sidebar with features and footer
 with st.sidebar:
     st.divider()
@@ -84,10 +87,12 @@ if not groq_api_key:
     st.stop()
 
 # Initialize AI Agents for summarization and analysis
-agents = ResearchAgents(groq_api_key)
+agents = get_research_agents(groq_api_key)
 
-# Initialize DataLoader for fetching research papers
-data_loader = DataLoader(search_agent=agents.summarizer_agent)
+# Fetch -> process -> store runs as a background job of the pipeline service (see pipeline.py),
+# so it survives reruns and navigation; papers processed by any earlier session or batch run
+# are reused instead of re-running the agents
+jobs = get_job_queue(groq_api_key)
 col1, col2 = st.columns([2.5, 1.5])  # 3:2 ratio for main + comparison
 
 # Use chat_input instead of text_input for entering the research topic.
@@ -99,120 +104,145 @@ elif "active_query" in st.session_state:
 
 # Trigger the search automatically if a query is provided.
 if query:
-    with st.spinner("Fetching research papers..."):  # Show a loading spinner
-        
-        all_papers = []
-        # Fetch from selected sources based on sidebar choices
-        if "ArXiv" in source_choice:
-            arxiv_papers = data_loader.fetch_arxiv_papers(query, limit=num_results)
-            all_papers.extend(arxiv_papers)
-        if "Google Scholar" in source_choice:
-            google_scholar_papers = data_loader.fetch_google_scholar_papers(query)
-            all_papers.extend(google_scholar_papers)
-
-        # If no papers are found, display an error message
-        if not all_papers:
-            st.error("Failed to fetch papers. Try again!")
-        else:
-            processed_papers = []
-
-            # Process each paper: generate summary and analyze advantages/disadvantages
-            for paper in all_papers:
-                summary = agents.summarize_paper(paper['summary'])  # Generate summary
-                adv_dis = agents.analyze_advantages_disadvantages(summary)  # Analyze pros/cons
-                visualization_suggestion = agents.generate_visualization(summary)
-                processed_papers.append({
-                    "title": paper["title"],
-                    "link": paper["link"],
-                    "summary": summary,
-                    "advantages_disadvantages": adv_dis,
-                    "visualization": visualization_suggestion,
-                })
-            # ✅ Store all papers for comparison section
-            st.session_state["all_papers"] = processed_papers
-
-            with col1:
-                # Display the processed research papers
-                st.subheader("Top Research Papers:")
-                for i, paper in enumerate(processed_papers, 1):
-                    st.markdown(f"### {i}. {paper['title']}")  # Paper title
-                    st.markdown(f"🔗 [Read Paper]({paper['link']})")  # Paper link
-                    st.write(f"**Summary:** {paper['summary']}")  # Paper summary
-                    st.write(f"{paper['advantages_disadvantages']}")  # Pros/cons analysis
-                    with st.expander("📊 Suggested Visualization"):
-                        st.markdown(paper["visualization"])
-
-                        # Optional: Try executing matplotlib/seaborn code if included
-                        if "import matplotlib" in paper["visualization"] or "plt." in paper["visualization"]:
-                            try:
-                                exec_globals = {}
-                                exec(paper["visualization"], exec_globals)
-                                st.pyplot(exec_globals.get('plt', None))
-                            except Exception as e:
-                                st.warning("⚠️ Couldn't render chart: " + str(e))
-                    st.markdown("---")  # Separator between papers
-                    # Create a "Chat about this paper" button
-                    if st.button(f"💬 Chat about this paper", key=f"chat_button_{i}"):
-                        query_params = {
-                            "title": paper["title"],
-                            "summary": paper["summary"],
-                            "adv": paper["advantages_disadvantages"]
-                        }
-                        encoded = urllib.parse.urlencode(query_params, quote_via=urllib.parse.quote)
-                        chat_url = f"/Paper%20Q%26A?{encoded}"
-                        st.markdown(f'<meta http-equiv="refresh" content="0; url={chat_url}" />', unsafe_allow_html=True)
-                if st.button("🧠 Show Topic Network Graph"):
-                    G = build_keyword_graph(processed_papers)
-                    visualize_graph_pyvis(G)
-                with st.expander("📚 Get Citation Suggestions for Your Thesis"):
-                    thesis_topic = st.text_input("Enter your thesis topic:")
-                    if st.button("📌 Suggest Citations"):
-                        if not thesis_topic.strip():
-                            st.warning("Please enter a thesis topic.")
-                        else:
-                            st.info("Analyzing papers for citation suitability...")
-                            citation_suggestions = agents.recommend_citations(thesis_topic, processed_papers)
-                            st.markdown("### 📝 Citation Suggestions")
-                            st.write(citation_suggestions)
-                if st.session_state.get("trigger_redirect"):
-                    st.session_state.trigger_redirect = False
-                    st.markdown('<meta http-equiv="refresh" content="0; url=/chat_page">', unsafe_allow_html=True)
-                with col2:
-                    st.header("⚖️ Compare Papers")
-                    if "all_papers" in st.session_state:
-                        paper_titles = [p["title"] for p in st.session_state["all_papers"]]
-                        selected = st.multiselect("Select 2–3 papers", paper_titles)
-
-                        if len(selected) >= 2:
-                            to_compare = [p for p in st.session_state["all_papers"] if p["title"] in selected]
-                            if st.button("🔍 Compare Now"):
-                                comparison_result = agents.compare_papers(to_compare)
-                                st.markdown("### 📊 Comparison Result")
-                                st.markdown(comparison_result)
+    # Widget interactions rerun this script; a job is only submitted for a new query or source
+    # selection, and identical searches from any session share one job (results kept for 6 hours)
+    params = {"query": query, "sources": list(source_choice), "limit": num_results}
+    if st.session_state.get("research_params") != params:
+        st.session_state["research_job"] = jobs.submit("research", params, max_age=6 * 3600)
+        st.session_state["research_params"] = params
+    job = jobs.get(st.session_state["research_job"])
+    if job is None:  # The job store was cleared; search again
+        st.session_state.pop("research_params", None)
+        st.rerun()
+    processed_papers = job["result"] if job["status"] == DONE else None
+
+    if job["status"] in ACTIVE_STATUSES:
+        with col1:
+            # Papers found so far are listed while they are analyzed
+            render_job_progress(jobs, job["id"], render_partial=lambda papers: st.markdown(
+                "\n".join(f"- [{paper['title']}]({paper['link']})" for paper in papers)
+            ))
+    elif job["status"] != DONE:
+        st.error(f"Search {job['status']}. {job['error'] or ''}")
+        if st.button("🔁 Retry search"):
+            st.session_state.pop("research_params", None)
+            st.rerun()
+    # If no papers are found, display an error message
+    elif not processed_papers:
+        st.error("Failed to fetch papers. Try again!")
+    else:
+        # ✅ Store all papers for comparison section
+        st.session_state["all_papers"] = processed_papers
+        # Other pages offer these papers, with their stored summaries and analyses
+        remember_papers([paper_id(paper) for paper in processed_papers])
+
+        # Chart code from the visualization agent renders in sandboxed worker processes while
+        # the papers are laid out; rendered PNGs are cached by snippet hash
+        renderer = get_visualization_renderer()
+        charts = {}
+        for i, paper in enumerate(processed_papers, 1):
+            code = extract_code(paper["visualization"])
+            if code:
+                charts[i] = renderer.submit(code)
+
+        with col1:
+            # Failed analyses are not stored, so a new job retries just those papers
+            if any(paper.get("incomplete") for paper in processed_papers):
+                st.warning("Some papers could not be fully analyzed.")
+                if st.button("🔁 Retry failed analyses"):
+                    st.session_state["research_job"] = jobs.submit("research", params, max_age=0)
+                    st.rerun()
+            # Display the processed research papers
+            st.subheader("Top Research Papers:")
+            for i, paper in enumerate(processed_papers, 1):
+                st.markdown(f"### {i}. {paper['title']}")  # Paper title
+                st.markdown(f"🔗 [Read Paper]({paper['link']})")  # Paper link
+                st.write(f"**Summary:** {paper['summary']}")  # Paper summary
+                st.write(f"{paper['advantages_disadvantages']}")  # Pros/cons analysis
+                with st.expander("📊 Suggested Visualization"):
+                    st.markdown(paper["visualization"])
+
+                    # Optional: show the chart if the answer included matplotlib/seaborn code
+                    if i in charts:
+                        render_chart(charts[i])
+                st.markdown("---")  # Separator between papers
+                # Create a "Chat about this paper" button
+                if st.button(f"💬 Chat about this paper", key=f"chat_button_{i}"):
+                    # The link carries only a short handle; the chat page loads the paper from the handle store
+                    handle = get_paper_handles().put({
+                        "id": paper_id(paper),
+                        "title": paper["title"],
+                        "link": paper["link"],
+                        "summary": paper["summary"],
+                        "advantages_disadvantages": paper["advantages_disadvantages"],
+                    })
+                    chat_url = f"/Paper%20Q%26A?paper={handle}"
+                    st.markdown(f'<meta http-equiv="refresh" content="0; url={chat_url}" />', unsafe_allow_html=True)
+            if st.button("🧠 Show Topic Network Graph"):
+                # Reuse this query's graph index so only newly fetched papers are extracted and added
+                graph_index = st.session_state.setdefault("keyword_graph_index", {}).setdefault(query, KeywordGraphIndex())
+                graph_index.add_papers(processed_papers)
+                # Large topic graphs are collapsed into keyword communities and capped by weighted degree
+                visualize_graph_pyvis(
+                    graph_index.graph, top_k=300, by="weight",
+                    collapse=graph_index.graph.number_of_nodes() > 1000,
+                )
+            with st.expander("📚 Get Citation Suggestions for Your Thesis"):
+                thesis_topic = st.text_input("Enter your thesis topic:")
+                if st.button("📌 Suggest Citations"):
+                    if not thesis_topic.strip():
+                        st.warning("Please enter a thesis topic.")
                     else:
-                        st.info("Search for papers to enable comparison.")
-                    st.subheader("🤼‍♂️ Paper Debate Agent")
-                    selected_summary = st.text_area("📄 Paste a paper summary for debate:", height=300)
-                    if st.button("🔥 Start Debate"):
-                        if not selected_summary:
-                            st.warning("Please paste a summary first.")
-                        else:
-                            with st.spinner("Debating like academic pros..."):
-                                support_prompt = f"You are a research supporter. Argue in favor of the paper below. Highlight its innovation, methodology, and potential impact.\n\nPaper Summary:\n{selected_summary}"
-                                critic_prompt = f"You are a research critic. Point out limitations, assumptions, or flaws in the paper below. Be rigorous but fair.\n\nPaper Summary:\n{selected_summary}"
-                                balance_prompt = f"Based on the following debate, provide a balanced evaluation of the paper including strengths and weaknesses.\n\nSupporter: {{support}}\n\nCritic: {{critic}}"
-
-                                supporter = agents.summarizer_agent.generate_reply(messages=[{"role": "user", "content": support_prompt}]).get("content", "")
-                                critic = agents.advantages_disadvantages_agent.generate_reply(messages=[{"role": "user", "content": critic_prompt}]).get("content", "")
-                                synthesis = agents.summarizer_agent.generate_reply(messages=[{"role": "user", "content": balance_prompt.format(support=supporter, critic=critic)}]).get("content", "")
-
-                                st.markdown("### 🟢 Supporter Agent")
-                                st.markdown(supporter)
-
-                                st.markdown("### 🔴 Critic Agent")
-                                st.markdown(critic)
-
-                                st.markdown("### ⚖️ Balanced Evaluation")
-                                st.markdown(synthesis)
-
-            
\ No newline at end of file
+                        st.info("Analyzing papers for citation suitability...")
+                        citation_suggestions = agents.recommend_citations(thesis_topic, processed_papers)
+                        st.markdown("### 📝 Citation Suggestions")
+                        st.write(citation_suggestions)
+            if st.session_state.get("trigger_redirect"):
+                st.session_state.trigger_redirect = False
+                st.markdown('<meta http-equiv="refresh" content="0; url=/chat_page">', unsafe_allow_html=True)
+            with col2:
+                st.header("⚖️ Compare Papers")
+                if "all_papers" in st.session_state:
+                    paper_titles = [p["title"] for p in st.session_state["all_papers"]]
+                    selected = st.multiselect("Select 2–3 papers", paper_titles)
+
+                    if len(selected) >= 2:
+                        to_compare = [p for p in st.session_state["all_papers"] if p["title"] in selected]
+                        if st.button("🔍 Compare Now"):
+                            comparison_result = agents.compare_papers(to_compare)
+                            st.markdown("### 📊 Comparison Result")
+                            st.markdown(comparison_result)
+                else:
+                    st.info("Search for papers to enable comparison.")
+                st.subheader("🤼‍♂️ Paper Debate Agent")
+                selected_summary = st.text_area("📄 Paste a paper summary for debate:", height=300)
+                if st.button("🔥 Start Debate"):
+                    if not selected_summary:
+                        st.warning("Please paste a summary first.")
+                    else:
+                        support_prompt = f"You are a research supporter. Argue in favor of the paper below. Highlight its innovation, methodology, and potential impact.\n\nPaper Summary:\n{selected_summary}"
+                        critic_prompt = f"You are a research critic. Point out limitations, assumptions, or flaws in the paper below. Be rigorous but fair.\n\nPaper Summary:\n{selected_summary}"
+                        balance_prompt = f"Based on the following debate, provide a balanced evaluation of the paper including strengths and weaknesses.\n\nSupporter: {{support}}\n\nCritic: {{critic}}"
+
+                        # Supporter and critic run concurrently; only the synthesis waits for both
+                        # and every argument streams into its placeholder as it is written
+                        panel = RolePanel(max_workers=2)
+                        panel.add("supporter", lambda _: agents.stream_agent(agents.summarizer_agent, support_prompt), stream=True)
+                        panel.add("critic", lambda _: agents.stream_agent(agents.advantages_disadvantages_agent, critic_prompt), stream=True)
+                        panel.add(
+                            "synthesis",
+                            lambda debate: agents.stream_agent(agents.summarizer_agent, balance_prompt.format(support=debate["supporter"], critic=debate["critic"])),
+                            depends_on=("supporter", "critic"),
+                            stream=True,
+                        )
+
+                        placeholders = {}
+                        for name, heading in (("supporter", "### 🟢 Supporter Agent"), ("critic", "### 🔴 Critic Agent"), ("synthesis", "### ⚖️ Balanced Evaluation")):
+                            st.markdown(heading)
+                            placeholders[name] = st.empty()
+                            placeholders[name].markdown("⏳ Debating like academic pros...")
+                        for name, argument, _ in panel.stream():
+                            placeholders[name].markdown(argument)
+
+# Latency, token and cache breakdown for the latest run
+render_metrics_sidebar(st.session_state.get("research_job"))  # The search job's own spans
@@ -0,0 +1,106 @@
+import threading
+
+from agents import FALLBACK_TEXT, or_default
+
+# Per-paper outputs stored as columns of the corpus store's paper records; every other
+# kind is kept in its artifacts table
+RECORD_KINDS = ("summary", "advantages_disadvantages", "visualization")
+
+EXPERIMENT_PROMPT = """
+Based on the following research summary, generate a complete experiment plan in Python. Include:
+1. Pseudocode of the methodology
+2. Dataset links
+3. Suggested model architecture
+4. Evaluation metrics to use
+
+Summary:
+{summary}
+"""
+
+STARTUP_PROMPT = """
+        Based on this research summary or topic:
+
+        "{summary}"
+
+        Generate the following:
+        1. Real-World Problem it solves
+        2. Bold Startup Idea (short description)
+        3. MVP Plan (Tech Stack, Tools, Dataset)
+        4. One-line Pitch for investors
+        5. Ideal VCs or funding sources
+        6. Competitive Advantage
+        7. Risk and how to mitigate it
+        Format it in a clean markdown table or bullet points.
+        """
+
+
+class PaperArtifacts:
+    """
+    Agent outputs per paper, shared by every page and session and keyed by paper id
+    (see data_loader.paper_id).
+
+    `get(paper_id, kind)` returns the stored artifact or computes it from the paper's summary
+    (itself computed from the abstract when missing), stores it and returns it. Concurrent
+    requests for the same artifact wait for a single computation. When the agent call fails,
+    `get` returns None and nothing is stored, so the next request tries again.
+    """
+
+    def __init__(self, corpus, agents):
+        self.corpus = corpus
+        self.agents = agents
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._generators = {
+            "summary": lambda record: self.agents.summarize_paper(record["abstract"], default=None),
+            "advantages_disadvantages": lambda summary: self.agents.analyze_advantages_disadvantages(summary, default=None),
+            "visualization": lambda summary: self.agents.generate_visualization(summary, default=None),
+            "experiment_plan": lambda summary: self.for_summary(summary, "experiment_plan"),
+            "startup_idea": lambda summary: self.for_summary(summary, "startup_idea"),
+        }
+
+    def stored(self, paper_id, kind):
+        """Returns the artifact if it was already computed, without computing it."""
+        if kind in RECORD_KINDS:
+            value = (self.corpus.get(paper_id) or {}).get(kind)
+            return None if value == FALLBACK_TEXT.get(kind) else value  # Stored by older runs
+        return self.corpus.get_artifact(paper_id, kind)
+
+    def get(self, paper_id, kind):
+        """Returns the `kind` artifact of a stored paper, computing and storing it if missing."""
+        value = self.stored(paper_id, kind)
+        if value:
+            return value
+        with self._locks_lock:
+            lock = self._locks.setdefault((paper_id, kind), threading.Lock())
+        with lock:
+            value = self.stored(paper_id, kind)  # Computed by another caller while we waited
+            if value:
+                return value
+            record = self.corpus.get(paper_id)
+            if record is None:
+                raise KeyError(f"Unknown paper '{paper_id}'")
+            generate = or_default(self._generators[kind], None)
+            if kind == "summary":
+                value = generate(record)
+            else:
+                summary = self.get(paper_id, "summary")
+                value = generate(summary) if summary else None
+            if not value:
+                return None
+            if kind in RECORD_KINDS:
+                self.corpus.upsert_many([{"id": paper_id, kind: value}])
+            else:
+                self.corpus.put_artifact(paper_id, kind, value)
+            return value
+
+    def for_summary(self, summary, kind):
+        """Computes a prompt-based artifact for free text such as a pasted summary (not stored per
+        paper); None if the request fails."""
+        prompt = {"experiment_plan": EXPERIMENT_PROMPT, "startup_idea": STARTUP_PROMPT}[kind]
+        return or_default(self.agents.ask_agent, None)(self.agents.summarizer_agent, prompt.format(summary=summary), None)
+
+    def records(self, paper_ids):
+        """Returns the stored records for `paper_ids`, in order, skipping unknown ids."""
+        found = self.corpus.get_many(paper_ids)
+        return [found[pid] for pid in paper_ids if pid in found]
+
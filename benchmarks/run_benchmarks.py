@@ -0,0 +1,198 @@
+"""
+Offline benchmark for the ReGenAI pipeline: arXiv fetch -> paper processing -> keyword graph.
+
+The stages run through ResearchPipeline as the app runs them: fetching goes through
+DataLoader.fetch_papers (dedupe, paper index, rerank) and processing through
+ResearchPipeline.process (corpus store lookups, batched summaries, stores). Everything runs
+locally: LLM calls go to one MockLLM backend shared by every agent (configurable latency and
+token rate, plus Groq-style per-key rate limits with --rpm/--tpm), arXiv requests to a stub
+server replaying benchmarks/fixtures/arxiv_query.xml, and each round gets an in-memory
+corpus store and paper index (hashing embedder, so no model download).
+
+The keyword graph needs NLTK's stopwords and tokenizer data, which is downloaded on first
+run; pass --no-graph to skip that stage.
+
+    python benchmarks/run_benchmarks.py --sizes 5 50 500 --latency 0.05 --tokens-per-second 400
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import nltk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents import ResearchAgents
+from benchmarks.stub_arxiv_server import StubArxivServer
+from data_loader import DataLoader
+from pipeline import ResearchPipeline
+from utils.corpus_store import CorpusStore
+from utils.graph_builder import build_keyword_graph, extract_keywords
+from utils.http_client import CachedHttpClient, RateLimiter
+from utils.llm_cache import LLMResponseCache
+from utils.llm_scheduler import LLMScheduler
+from utils.mock_llm import MockAssistantAgent, MockLLM
+from utils.vector_index import HashingEmbedder, PaperIndex
+
+PAPERS_PER_QUERY = 5  # Papers fetched per query, as on the search page
+
+# NLTK data used by RAKE keyword extraction; punkt_tab replaces punkt in newer NLTK releases
+NLTK_PACKAGES = ("stopwords", "punkt", "punkt_tab")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def build_pipeline(args, arxiv_url):
+    # One mock backend for every agent and for streaming, enforcing the per-key limits if
+    # given; the scheduler is sized to the same limits, as in the app
+    llm = MockLLM(
+        first_token_delay=args.latency,
+        token_delay=1.0 / args.tokens_per_second if args.tokens_per_second else 0.0,
+        requests_per_minute=args.rpm,
+        tokens_per_minute=args.tpm,
+    )
+    agents = ResearchAgents(
+        "mock",
+        max_workers=args.workers,
+        cache=LLMResponseCache(":memory:") if args.cache else False,
+        stream_client=llm,
+        scheduler=LLMScheduler(requests_per_minute=args.rpm or 10**6, tokens_per_minute=args.tpm or 10**9),
+        agent_cls=MockAssistantAgent,
+        agent_kwargs={"llm": llm},
+    )
+    loader = DataLoader(
+        http_client=CachedHttpClient(cache=False, rate_limiter=RateLimiter(interval=0)),
+        arxiv_url=arxiv_url,
+        paper_index=PaperIndex(directory=None, embedder=HashingEmbedder()),
+    )
+    return ResearchPipeline(agents, loader, CorpusStore(":memory:"))
+
+
+def ensure_nltk_data():
+    """Downloads missing NLTK data for the keyword graph, raising if extraction still fails."""
+    for package in NLTK_PACKAGES:
+        nltk.download(package, quiet=True, raise_on_error=False)
+    try:
+        extract_keywords("Keyword extraction check for the benchmark graph stage.")
+    except LookupError as e:
+        raise SystemExit(f"The keyword graph stage needs NLTK data that could not be downloaded "
+                         f"(run with --no-graph to skip it):\n{e}")
+
+
+def run_size(size, args, arxiv_url, round_index):
+    """Runs one pass of the pipeline over `size` papers and returns its measurements."""
+    pipeline = build_pipeline(args, arxiv_url)
+    queries = [f"benchmark topic {round_index} {i}" for i in range(max(1, size // PAPERS_PER_QUERY))]
+    query_latencies = []
+
+    def fetch(query):
+        started = time.perf_counter()
+        papers = pipeline.fetch(query, limit=PAPERS_PER_QUERY)
+        query_latencies.append(time.perf_counter() - started)
+        return papers
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        papers = [paper for batch in pool.map(fetch, queries) for paper in batch][:size]
+    fetched = time.perf_counter()
+    processed = pipeline.process(papers)
+    summarized = time.perf_counter()
+    graph = build_keyword_graph(processed) if args.graph else None
+    finished = time.perf_counter()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "papers": len(processed),
+        "queries": len(queries),
+        "fetch_s": fetched - started,
+        "process_s": summarized - fetched,
+        "graph_s": finished - summarized if graph is not None else None,
+        "total_s": finished - started,
+        "query_latencies": query_latencies,
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+def summarize(size, runs):
+    latencies = [latency for run in runs for latency in run["query_latencies"]]
+    totals = [run["total_s"] for run in runs]
+    graph_times = [run["graph_s"] for run in runs if run["graph_s"] is not None]
+    return {
+        "size": size,
+        "rounds": len(runs),
+        "papers": runs[0]["papers"],
+        "queries_per_s": sum(run["queries"] for run in runs) / sum(totals),
+        "papers_per_s": sum(run["papers"] for run in runs) / sum(totals),
+        "query_p50_ms": percentile(latencies, 0.5) * 1000,
+        "query_p95_ms": percentile(latencies, 0.95) * 1000,
+        "e2e_p50_s": percentile(totals, 0.5),
+        "e2e_p95_s": percentile(totals, 0.95),
+        "fetch_s": sum(run["fetch_s"] for run in runs) / len(runs),
+        "process_s": sum(run["process_s"] for run in runs) / len(runs),
+        "graph_s": sum(graph_times) / len(graph_times) if graph_times else None,
+        "peak_mb": max(run["peak_mb"] for run in runs),
+    }
+
+
+COLUMNS = [
+    ("size", "{:>6d}"), ("queries_per_s", "{:>13.1f}"), ("papers_per_s", "{:>12.1f}"),
+    ("query_p50_ms", "{:>12.1f}"), ("query_p95_ms", "{:>12.1f}"), ("e2e_p50_s", "{:>9.2f}"),
+    ("e2e_p95_s", "{:>9.2f}"), ("fetch_s", "{:>7.2f}"), ("process_s", "{:>9.2f}"),
+    ("graph_s", "{:>7.2f}"), ("peak_mb", "{:>7.1f}"),
+]
+
+
+def print_table(results):
+    widths = [len(fmt.format(0)) for _, fmt in COLUMNS]
+    print(" ".join(name.rjust(width) for (name, _), width in zip(COLUMNS, widths)))
+    for result in results:
+        print(" ".join(
+            fmt.format(result[name]) if result[name] is not None else "-".rjust(width)
+            for (name, fmt), width in zip(COLUMNS, widths)
+        ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline throughput/latency/memory benchmark for the ReGenAI pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 500], help="Paper counts to benchmark")
+    parser.add_argument("--rounds", type=int, default=3, help="Repetitions per size")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent fetches and LLM calls")
+    parser.add_argument("--latency", type=float, default=0.02, help="Mock LLM seconds before the first token")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Mock LLM generation rate (default: instant)")
+    parser.add_argument("--rpm", type=int, default=None, help="Mock backend and scheduler requests per minute (default: unlimited)")
+    parser.add_argument("--tpm", type=int, default=None, help="Mock backend and scheduler tokens per minute (default: unlimited)")
+    parser.add_argument("--arxiv-latency", type=float, default=0.0, help="Stub arXiv server delay per request")
+    parser.add_argument("--no-graph", dest="graph", action="store_false", help="Skip the keyword graph stage")
+    parser.add_argument("--no-cache", dest="cache", action="store_false", help="Disable the LLM response cache")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to PATH as JSON")
+    args = parser.parse_args(argv)
+
+    if args.graph:
+        ensure_nltk_data()
+
+    results = []
+    with StubArxivServer(latency=args.arxiv_latency) as server:
+        for size in args.sizes:
+            runs = [run_size(size, args, server.url, round_index) for round_index in range(args.rounds)]
+            results.append(summarize(size, runs))
+
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main()
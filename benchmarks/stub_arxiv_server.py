@@ -0,0 +1,94 @@
+import copy
+import hashlib
+import os
+import threading
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+OPENSEARCH = "{http://a9.com/-/spec/opensearch/1.1/}"
+FIXTURE_PATH = os.path.join(os.path.dirname(__file__), "fixtures", "arxiv_query.xml")
+
+ET.register_namespace("", "http://www.w3.org/2005/Atom")
+ET.register_namespace("opensearch", "http://a9.com/-/spec/opensearch/1.1/")
+ET.register_namespace("arxiv", "http://arxiv.org/schemas/atom")
+
+
+class StubArxivServer:
+    """
+    Serves a recorded arXiv Atom response on localhost so DataLoader can be driven offline.
+
+    Every query gets the fixture entries back with ids and titles rewritten from a hash of
+    the query and the requested window, so distinct queries yield distinct papers (as the
+    real API would) while repeated queries stay byte-identical. Paging with start and
+    max_results works up to the fixture's totalResults.
+    """
+
+    def __init__(self, fixture_path=FIXTURE_PATH, latency=0.0):
+        self.latency = latency
+        self.requests = 0
+        self._feed = ET.parse(fixture_path).getroot()
+        self._entries = self._feed.findall(f"{ATOM}entry")
+        self.total_results = int(self._feed.find(f"{OPENSEARCH}totalResults").text)
+        for entry in self._entries:
+            self._feed.remove(entry)
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/api/query"
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def render(self, query, start, max_results):
+        """Returns the Atom feed for one search request."""
+        feed = copy.deepcopy(self._feed)
+        seed = hashlib.sha1(query.encode("utf-8")).hexdigest()
+        feed.find(f"{OPENSEARCH}startIndex").text = str(start)
+        for offset in range(start, min(start + max_results, self.total_results)):
+            entry = copy.deepcopy(self._entries[offset % len(self._entries)])
+            paper_number = int(seed[:6], 16) % 9000 + 1000
+            entry.find(f"{ATOM}id").text = f"http://arxiv.org/abs/{paper_number}.{offset:05d}v1"
+            title = entry.find(f"{ATOM}title")
+            title.text = f"{title.text} ({query}, #{offset})"
+            feed.append(entry)
+        return ET.tostring(feed, encoding="utf-8", xml_declaration=True)
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                query = params.get("search_query", [""])[0]
+                start = int(params.get("start", ["0"])[0])
+                max_results = int(params.get("max_results", ["5"])[0])
+                if stub.latency:
+                    threading.Event().wait(stub.latency)
+                stub.requests += 1
+                body = stub.render(query, start, max_results)
+                self.send_response(200)
+                self.send_header("Content-Type", "application/atom+xml; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -1,10 +1,220 @@
-import requests
+import json
+import os
+import re
+import time
+import unicodedata
 import xml.etree.ElementTree as ET
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from scholarly import scholarly
+from utils.http_client import get_shared_client
+from utils.llm_scheduler import get_shared_scheduler
+from utils.metrics import metrics
+from utils.minhash import MinHasher, shingles
+
+ARXIV_API_URL = "http://export.arxiv.org/api/query"
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+OPENSEARCH_NS = "{http://a9.com/-/spec/opensearch/1.1/}"
+ARXIV_REQUEST_DELAY = 3.0  # arXiv asks API clients to wait 3 seconds between requests
+NEAR_DUPLICATE_THRESHOLD = 0.8  # Estimated abstract Jaccard similarity at which two papers are merged
+
+
+def normalize_query(query):
+    """Normalizes a search query so equivalent queries share a cache entry."""
+    return " ".join(query.lower().split())
+
+
+def arxiv_id(link):
+    """Extracts the version-less arXiv identifier from an abs/pdf link, falling back to the link itself."""
+    match = re.search(r"arxiv\.org/(?:abs|pdf)/([^\s?#]+?)(?:v\d+)?(?:\.pdf)?$", link or "")
+    return match.group(1) if match else link
+
+
+def normalize_title(title):
+    """Lowercases a title and strips punctuation and extra whitespace for duplicate detection."""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", (title or "").lower()).split())
+
+
+def extract_doi(paper):
+    """Returns the lowercased DOI of a paper from its `doi` field or link, or None."""
+    text = paper.get("doi") or paper.get("link") or ""
+    match = re.search(r"10\.\d{4,9}/[^\s?#&]+", text)
+    return match.group(0).rstrip(".").lower() if match else None
+
+
+def paper_id(paper):
+    """Stable identifier for a paper: its arXiv id, else its DOI, else its normalized title."""
+    link = paper.get("link") or ""
+    if "arxiv.org/" in link:
+        return f"arxiv:{arxiv_id(link)}"
+    doi = extract_doi(paper)
+    return f"doi:{doi}" if doi else f"title:{normalize_title(paper.get('title'))}"
+
+
+def arxiv_entry_to_paper(entry):
+    """Converts an Atom <entry> element from the arXiv API into a paper dictionary."""
+    return {
+        "title": entry.find(f"{ATOM_NS}title").text,
+        "summary": entry.find(f"{ATOM_NS}summary").text,
+        "link": entry.find(f"{ATOM_NS}id").text,
+    }
+
+
+def iter_arxiv_feed(source, on_total=None):
+    """
+    Incrementally parses an arXiv Atom feed from a file object, yielding one paper per
+    <entry> and discarding each element once converted, so memory stays flat however
+    large the feed is. `on_total` is called with opensearch:totalResults when it is read.
+    """
+    for _, elem in ET.iterparse(source, events=("end",)):
+        if elem.tag == f"{ATOM_NS}entry":
+            yield arxiv_entry_to_paper(elem)
+            elem.clear()
+        elif elem.tag == f"{OPENSEARCH_NS}totalResults" and on_total is not None:
+            on_total(int(elem.text or 0))
+
+
+def load_harvest_checkpoint(path, query, default=0):
+    """Returns the offset saved in the checkpoint at `path` for `query`, or `default`."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return default
+    return checkpoint.get("offset", default) if checkpoint.get("query") == query else default
+
+
+def save_harvest_checkpoint(path, query, offset):
+    """Atomically records that `query` has been harvested up to `offset`."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"query": query, "offset": offset}, f)
+    os.replace(tmp_path, path)
+
+
+def canonical_title(title):
+    """
+    Canonical form of a title for duplicate detection: accents, LaTeX markup, punctuation,
+    case and spacing differences between a preprint and its published version are ignored.
+    """
+    title = unicodedata.normalize("NFKD", title or "")
+    title = "".join(c for c in title if not unicodedata.combining(c))
+    title = re.sub(r"\\[a-zA-Z]+|[${}]", " ", title)
+    return normalize_title(title)
+
+
+def duplicate_keys(paper):
+    """Exact-match keys of a paper: its arXiv id, DOI and canonical title."""
+    link = paper.get("link") or ""
+    keys = [
+        f"arxiv:{arxiv_id(link)}" if "arxiv.org/" in link else None,
+        f"doi:{extract_doi(paper)}" if extract_doi(paper) else None,
+        f"title:{canonical_title(paper.get('title'))}" if canonical_title(paper.get("title")) else None,
+    ]
+    return [key for key in keys if key]
+
+
+_minhasher = MinHasher()
+
+
+def dedupe_papers(papers, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """
+    Collapses duplicate papers, keeping the first occurrence of each. Two papers match when
+    they share an arXiv id, DOI or canonical title, or when the MinHash similarity of their
+    abstracts' word shingles reaches `threshold` (None disables near-duplicate matching).
+    Each kept paper's `sources` lists every source its duplicates came from, and a missing
+    DOI is taken from a duplicate.
+    """
+    unique, signatures = [], []
+    owners = {}  # Exact-match key -> index in unique
+    buckets = defaultdict(list)  # LSH band key -> indices in unique
+    for paper in papers:
+        keys = duplicate_keys(paper)
+        match = next((owners[key] for key in keys if key in owners), None)
+
+        signature = None
+        if match is None and threshold is not None:
+            signature = _minhasher.signature(shingles(paper.get("summary")))
+        if signature is not None:
+            candidates = {i for band in _minhasher.band_keys(signature) for i in buckets.get(band, ())}
+            match = next(
+                (i for i in sorted(candidates) if _minhasher.similarity(signature, signatures[i]) >= threshold), None
+            )
+
+        if match is None:
+            match = len(unique)
+            unique.append(dict(paper))
+            signatures.append(signature)
+            if signature is not None:
+                for band in _minhasher.band_keys(signature):
+                    buckets[band].append(match)
+        else:
+            kept = unique[match]
+            sources = kept.get("sources", []) + [s for s in paper.get("sources", []) if s not in kept.get("sources", [])]
+            if sources:
+                kept["sources"] = sources
+            if not extract_doi(kept) and extract_doi(paper):
+                kept["doi"] = extract_doi(paper)
+            metrics.increment("papers_deduplicated")
+        for key in keys:
+            owners.setdefault(key, match)
+    return unique
+
+
+# Registry of paper sources by display name; add a source with @register_source("Name")
+PAPER_SOURCES = {}
+
+
+def register_source(name):
+    """Class decorator that registers a PaperSource subclass under `name`."""
+    def decorator(cls):
+        cls.name = name
+        PAPER_SOURCES[name] = cls
+        return cls
+    return decorator
+
+
+class PaperSource:
+    """
+    Base class for paper sources. `fetch` yields paper dictionaries (title, summary, link)
+    one at a time so a source cut off by its deadline still contributes what it has found.
+    """
+    name = None
+    deadline = 20.0  # Seconds DataLoader.fetch_papers waits for this source
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def fetch(self, query, limit):
+        raise NotImplementedError
+
+
+@register_source("ArXiv")
+class ArxivSource(PaperSource):
+    deadline = 30.0
+
+    def fetch(self, query, limit):
+        yield from self.loader.iter_arxiv_papers(query, limit=limit)
+
+
+@register_source("Google Scholar")
+class GoogleScholarSource(PaperSource):
+    deadline = 15.0
+
+    def fetch(self, query, limit):
+        yield from self.loader.iter_google_scholar_papers(query, limit=limit or 5)
+
 
 class DataLoader:
-    def __init__(self, search_agent=None):
+    def __init__(self, search_agent=None, http_client=None, expansion_fanout=3, paper_index=None, arxiv_url=ARXIV_API_URL):
         self.search_agent = search_agent
+        self.arxiv_url = arxiv_url
+        # Optional utils.vector_index.PaperIndex: every fetched paper is embedded into it and
+        # fetch_papers(top_k=...) re-ranks fresh and previously indexed papers against the query
+        self.paper_index = paper_index
+        self.expansion_fanout = expansion_fanout  # Related topics fetched concurrently during query expansion
+        # Pooled, rate-limited client shared by every DataLoader unless one is injected
+        self.http_client = http_client or get_shared_client()
         print("DataLoader Init")
     def fetch_arxiv_papers(self, query, limit=None):  # Updated signature
         """
@@ -14,42 +224,141 @@ class DataLoader:
             Returns:
                 list: A list of dictionaries containing paper details (title, summary, link).
         """
-        
+        return list(self.iter_arxiv_papers(query, limit=limit))
+
+    def iter_arxiv_papers(self, query, limit=None):
+        """
+        Yields the arXiv results for `query` (at most 5, or `limit`): the main search's papers
+        first, as soon as they arrive, then papers of related topics when the main search
+        found too few. A caller that stops waiting during the expansion keeps the main results.
+        """
         def search_arxiv(query):
             """Helper function to query ArXiv API."""
-            url = f"http://export.arxiv.org/api/query?search_query=all:{query}&start=0&max_results=5"
-            response = requests.get(url)
-            if response.status_code == 200:
-                root = ET.fromstring(response.text)
-                return [
-                    {
-                        "title": entry.find("{http://www.w3.org/2005/Atom}title").text,
-                        "summary": entry.find("{http://www.w3.org/2005/Atom}summary").text,
-                        "link": entry.find("{http://www.w3.org/2005/Atom}id").text
-                    }
-                    for entry in root.findall("{http://www.w3.org/2005/Atom}entry")
-                ]
+            query = normalize_query(query)
+            with metrics.span("arxiv_fetch"):
+                body = self.http_client.get_text(
+                    self.arxiv_url,
+                    params={"search_query": f"all:{query}", "start": 0, "max_results": 5},
+                    cache_key=f"arxiv:{query}:0:5",
+                )
+            if body:
+                root = ET.fromstring(body)
+                return [arxiv_entry_to_paper(entry) for entry in root.findall(f"{ATOM_NS}entry")]
             return []
 
-        papers = search_arxiv(query)
+        quota = 5 if limit is None else min(5, limit)
+        papers = search_arxiv(query)[:quota]
+        yield from papers
 
-        if len(papers) < 5 and self.search_agent:  # If fewer than 5 papers, expand search
-            related_topics_response = self.search_agent.generate_reply(
-                messages=[{"role": "user", "content": f"Suggest 3 related research topics for '{query}'"}]
-            )
-            related_topics = related_topics_response.get("content", "").split("\n")
+        if len(papers) < quota and self.search_agent:  # If fewer than 5 papers, expand search
+            messages = [{"role": "user", "content": f"Suggest 3 related research topics for '{query}'"}]
+            related_topics_response = get_shared_scheduler().call(
+                lambda: self.search_agent.generate_reply(messages=messages), tokens=600
+            ) or {}
+            related_topics = [
+                topic.strip() for topic in related_topics_response.get("content", "").split("\n") if topic.strip()
+            ]
+            yield from self._iter_expanded(papers, related_topics, search_arxiv, quota)
 
-            for topic in related_topics:
-                topic = topic.strip()
-                if topic and len(papers) < 5:
-                    new_papers = search_arxiv(topic)
-                    papers.extend(new_papers)
-                    papers = papers[:5]  # Ensure max 5 papers
+    def harvest_arxiv(self, query, max_results=None, page_size=100, start=0, checkpoint=None,
+                      delay=ARXIV_REQUEST_DELAY, empty_page_retries=3):
+        """
+        Pages through every arXiv result for `query`, yielding papers as each page streams in.
 
-        if limit is not None:
-            papers = papers[:limit]
-            
-        return papers
+        Pages of `page_size` results are parsed incrementally and requested at least `delay`
+        seconds apart. Harvesting starts at offset `start`, or where the checkpoint file
+        `checkpoint` left off for this query; the checkpoint is updated after every page, so
+        an interrupted harvest resumes from its last complete page (papers of a partially
+        read page may be yielded again). Stops at the end of the results or once offset
+        `start + max_results` is reached, counting papers harvested before a resume. arXiv
+        occasionally returns an empty page mid-way; such pages are retried up to
+        `empty_page_retries` times.
+        """
+        query = normalize_query(query)
+        offset = load_harvest_checkpoint(checkpoint, query, default=start) if checkpoint else start
+        end = start + max_results if max_results is not None else None
+        total = None
+        retries = 0
+        last_request = None
+
+        def set_total(count):
+            nonlocal total
+            total = count
+
+        while end is None or offset < end:
+            if total is not None and offset >= total:
+                break
+            if last_request is not None:
+                time.sleep(max(0.0, delay - (time.monotonic() - last_request)))
+            last_request = time.monotonic()
+
+            size = min([page_size] + [limit - offset for limit in (end, total) if limit is not None])
+            params = {"search_query": f"all:{query}", "start": offset, "max_results": size}
+            # Only the request and parsing are timed, not the consumer's work between papers
+            count, busy, started = 0, 0.0, time.perf_counter()
+            with self.http_client.stream(self.arxiv_url, params=params) as body:
+                papers = iter_arxiv_feed(body, on_total=set_total)
+                while True:
+                    paper = next(papers, None)
+                    busy += time.perf_counter() - started
+                    if paper is None:
+                        break
+                    count += 1
+                    yield paper
+                    started = time.perf_counter()
+            metrics.observe("arxiv_harvest_page", busy)
+
+            if count == 0:
+                retries += 1
+                if retries > empty_page_retries:
+                    break
+                continue
+            retries = 0
+            offset += count
+            if checkpoint:
+                save_harvest_checkpoint(checkpoint, query, offset)
+
+    def _iter_expanded(self, papers, topics, search, quota):
+        """
+        Fetches `topics` concurrently and yields their papers in topic order, skipping arXiv ids
+        already in `papers` or yielded, until `papers` and the yielded ones reach `quota`.
+        """
+        seen = {arxiv_id(p["link"]) for p in papers}
+        count = len(papers)
+        if not topics or count >= quota:
+            return
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.expansion_fanout, len(topics))))
+        try:
+            futures = [pool.submit(metrics.in_trace(search), topic) for topic in topics]
+            for future in futures:
+                for paper in future.result():
+                    if count >= quota:
+                        return
+                    key = arxiv_id(paper["link"])
+                    if key not in seen:
+                        seen.add(key)
+                        count += 1
+                        yield paper
+        finally:
+            # Drop topics that have not started yet; in-flight requests finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(self.expansion_fanout, len(topics))))
+        try:
+            futures = [pool.submit(metrics.in_trace(search), topic) for topic in topics]
+            for future in futures:
+                if len(papers) >= quota:
+                    break
+                for paper in future.result():
+                    key = arxiv_id(paper["link"])
+                    if key not in seen:
+                        seen.add(key)
+                        papers.append(paper)
+        finally:
+            # Drop topics that have not started yet; in-flight requests finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+        return papers[:quota]
 
     def fetch_google_scholar_papers(self, query):
         """
@@ -57,15 +366,74 @@ class DataLoader:
             Returns:
                 list: A list of dictionaries containing paper details (title, summary, link)
         """
-        papers = []
+        return list(self.iter_google_scholar_papers(query))
+
+    def iter_google_scholar_papers(self, query, limit=5):
+        """Yields Google Scholar results one by one as scholarly scrapes them."""
         search_results = scholarly.search_pubs(query)
 
         for i, paper in enumerate(search_results):
-            if i >= 5:
+            if i >= limit:
                 break
-            papers.append({
+            yield {
                 "title": paper["bib"]["title"],
                 "summary": paper["bib"].get("abstract", "No summary available"),
                 "link": paper.get("pub_url", "No link available")
-            })
-        return papers
+            }
+
+    def fetch_papers(self, query, sources, limit=None, deadline=None, top_k=None):
+        """
+            Fetches papers from the registered `sources` (names in PAPER_SOURCES) in parallel.
+            Each source gets its own deadline (or `deadline` if given); a source that misses it
+            contributes the papers found so far. Results are merged in source order, and
+            duplicates (same arXiv id, DOI or canonical title, or near-identical abstracts) are
+            collapsed before any agent runs; each paper's `sources` names where it was found.
+            With `top_k`, only the `top_k` papers most similar to the query are returned, drawn
+            from the fresh results and, when a paper index is set, papers indexed earlier.
+
+            Returns:
+                list: A list of dictionaries containing paper details (title, summary, link).
+        """
+        selected = [PAPER_SOURCES[name](self) for name in sources if name in PAPER_SOURCES]
+        if not selected:
+            return []
+
+        found = {source.name: [] for source in selected}
+
+        def collect(source):
+            with metrics.span(f"source:{source.name}"):
+                for paper in source.fetch(query, limit):
+                    found[source.name].append({**paper, "sources": [source.name]})
+
+        pool = ThreadPoolExecutor(max_workers=len(selected))
+        started = time.monotonic()
+        try:
+            futures = [(source, pool.submit(metrics.in_trace(collect), source)) for source in selected]
+            for source, future in futures:
+                timeout = deadline if deadline is not None else source.deadline
+                try:
+                    future.result(timeout=max(0.0, timeout - (time.monotonic() - started)))
+                except FutureTimeoutError:
+                    print(f"{source.name} missed its {timeout}s deadline; using partial results")
+                except Exception as e:
+                    print(f"{source.name} fetch failed: {e}")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        papers = dedupe_papers([paper for source in selected for paper in list(found[source.name])])
+
+        if self.paper_index is not None:
+            try:
+                with metrics.span("paper_index_add"):
+                    self.paper_index.add(papers, paper_id)
+                if top_k:
+                    local = [
+                        {"title": paper["title"], "summary": paper["summary"], "link": paper["link"]}
+                        for paper, _ in self.paper_index.search(query, k=top_k, approximate=True)
+                    ]
+                    with metrics.span("rerank"):
+                        return self.paper_index.rerank(query, dedupe_papers(papers + local), top_k=top_k, id_fn=paper_id)
+            except Exception as e:
+                # The index only improves ranking; without it the fetched papers are returned in source order
+                print(f"Paper index unavailable: {e}")
+        return papers[:top_k] if top_k else papers
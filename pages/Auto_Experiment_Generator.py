@@ -1,7 +1,8 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from agents import ResearchAgents
+from resources import get_artifacts
+from utils.ui import recent_paper_ids
 
 # Load API key
 load_dotenv()
@@ -27,31 +28,39 @@ if not groq_api_key:
     st.error("GROQ_API_KEY not found. Please set it in your .env file.")
     st.stop()
 
-agents = ResearchAgents(groq_api_key)
+# Summaries and experiment plans are shared per paper with every other page
+artifacts = get_artifacts(groq_api_key)
 
-# Allow user to input or paste a paper summary
-summary = st.text_area("📄 Paste the summary of the paper:", height=300)
+PASTE = "✍️ Paste a summary"
 
-if st.button("🚀 Generate Experiment Setup"):
-    if not summary:
-        st.warning("Please paste a paper summary first.")
-    else:
+
+def show_plan(plan):
+    st.subheader("🧪 Experiment Plan")
+    st.markdown(plan or "No experiment generated.")
+
+
+# Papers from this session's searches and reading plans, or a pasted summary
+titles = {record["id"]: record["title"] for record in artifacts.records(recent_paper_ids())}
+choice = st.selectbox("📄 Pick a paper from your searches:", [*titles, PASTE], format_func=lambda pid: titles.get(pid, pid))
+
+if choice == PASTE:
+    # Allow user to input or paste a paper summary
+    summary = st.text_area("📄 Paste the summary of the paper:", height=300)
+
+    if st.button("🚀 Generate Experiment Setup"):
+        if not summary:
+            st.warning("Please paste a paper summary first.")
+        else:
+            with st.spinner("Thinking like a scientist... 🧠"):
+                show_plan(artifacts.for_summary(summary, "experiment_plan"))
+else:
+    with st.expander("📄 Summary"):
+        st.write(artifacts.stored(choice, "summary") or "Not summarized yet; the summary is generated with the plan.")
+
+    # A plan generated earlier for this paper, on any page or session, is shown right away
+    plan = artifacts.stored(choice, "experiment_plan")
+    if plan:
+        show_plan(plan)
+    elif st.button("🚀 Generate Experiment Setup"):
         with st.spinner("Thinking like a scientist... 🧠"):
-            prompt = f"""
-Based on the following research summary, generate a complete experiment plan in Python. Include:
-1. Pseudocode of the methodology
-2. Dataset links
-3. Suggested model architecture
-4. Evaluation metrics to use
-
-Summary:
-{summary}
-"""
-
-            response = agents.summarizer_agent.generate_reply(
-                messages=[{"role": "user", "content": prompt}]
-            )
-
-            result = response.get("content", "No experiment generated.")
-            st.subheader("🧪 Experiment Plan")
-            st.markdown(result)
+            show_plan(artifacts.get(choice, "experiment_plan"))
@@ -1,7 +1,10 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from agents import ResearchAgents
+from pipeline import lab_roles
+from resources import get_job_queue
+from utils.job_queue import ACTIVE_STATUSES, DONE
+from utils.ui import render_job_progress
 
 load_dotenv()
 groq_api_key = os.getenv("GROQ_API_KEY")
@@ -21,57 +24,36 @@ if not groq_api_key:
     st.error("GROQ_API_KEY not found. Please set it in your .env file.")
     st.stop()
 
-agents = ResearchAgents(groq_api_key)
+# The roles run as a background job, so the analysis survives reruns and navigation and
+# the same topic and advisor are only analyzed once
+jobs = get_job_queue(groq_api_key)
 
 # --- User Input ---
 topic = st.text_input("🎯 What research idea are you exploring?")
 advisor = st.selectbox("🎭 Pick a Research Advisor for Roleplay:", ["Alan Turing", "Fei-Fei Li", "Yann LeCun", "Geoffrey Hinton", "No Advisor"])
 
-# --- Multi-Agent Brainstorm ---
-if st.button("🤖 Generate Full Lab Analysis") and topic:
-    with st.spinner("Generating your research lab output..."):
-        # Innovator Agent
-        innovator_prompt = f"You are an innovative researcher. Suggest bold, unique applications for the research topic: '{topic}'"
-        innovator_response = agents.summarizer_agent.generate_reply(messages=[{"role": "user", "content": innovator_prompt}])
-
-        # Professor Agent
-        professor_prompt = f"As a research professor, outline key constraints, assumptions, and ethical concerns with the topic: '{topic}'"
-        professor_response = agents.advantages_disadvantages_agent.generate_reply(messages=[{"role": "user", "content": professor_prompt}])
-
-        # Fund Manager Agent
-        fund_prompt = f"You're a research fund evaluator. Evaluate the feasibility and funding potential of a project based on the topic: '{topic}'"
-        fund_response = agents.advantages_disadvantages_agent.generate_reply(messages=[{"role": "user", "content": fund_prompt}])
-
-        # Grant Pitch
-        pitch_prompt = f"Write a 1-page research grant pitch for: '{topic}' including Problem, Novelty, ROI, and Proposed Plan."
-        pitch_response = agents.summarizer_agent.generate_reply(messages=[{"role": "user", "content": pitch_prompt}])
-
-        # Research Chain Planner
-        chain_prompt = f"For the topic '{topic}', create a research roadmap: list key papers, suggest experiments, a paper outline, and a 3-month timeline."
-        chain_response = agents.summarizer_agent.generate_reply(messages=[{"role": "user", "content": chain_prompt}])
-
-        # Advisor Roleplay
-        if advisor != "No Advisor":
-            roleplay_prompt = f"Respond like {advisor} advising a student on the topic: '{topic}'. Include insights in their voice."
-            advisor_response = agents.summarizer_agent.generate_reply(messages=[{"role": "user", "content": roleplay_prompt}])
-        else:
-            advisor_response = {"content": "No advisor selected."}
 
-        # Display results
-        st.subheader("👩‍🔬 Innovator Agent Suggestions")
-        st.markdown(innovator_response.get("content", "-"))
-
-        st.subheader("🧑‍🏫 Professor Constraints & Ethics")
-        st.markdown(professor_response.get("content", "-"))
-
-        st.subheader("💼 Fund Manager Feasibility")
-        st.markdown(fund_response.get("content", "-"))
-
-        st.subheader("📄 1-Page Grant Pitch")
-        st.markdown(pitch_response.get("content", "-"))
+def show_analysis(answers, topic, advisor):
+    # Each section shows its role's answer as it streams in
+    for heading, _, _ in lab_roles(topic, advisor):
+        st.subheader(heading)
+        st.markdown(answers.get(heading, "⏳ Thinking..."))
+    if advisor == "No Advisor":
+        st.subheader(f"🎭 Advisor: {advisor}")
+        st.markdown("No advisor selected.")
 
-        st.subheader("🧩 Research Chain Planner")
-        st.markdown(chain_response.get("content", "-"))
 
-        st.subheader(f"🎭 Advisor: {advisor}")
-        st.markdown(advisor_response.get("content", "-"))
+# --- Multi-Agent Brainstorm ---
+if st.button("🤖 Generate Full Lab Analysis") and topic:
+    st.session_state["lab_job"] = jobs.submit("lab_analysis", {"topic": topic, "advisor": advisor})
+
+# A job no longer in the job store is simply not shown; generating again recreates it
+job = jobs.get(st.session_state["lab_job"]) if "lab_job" in st.session_state else None
+if job is not None:
+    params = job["params"]
+    if job["status"] in ACTIVE_STATUSES:
+        render_job_progress(jobs, job["id"], render_partial=lambda answers: show_analysis(answers, **params))
+    elif job["status"] != DONE:
+        st.error(f"Lab analysis {job['status']}. {job['error'] or ''}")
+    else:
+        show_analysis(job["result"], **params)
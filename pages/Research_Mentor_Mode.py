@@ -1,8 +1,10 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from agents import ResearchAgents
-from data_loader import DataLoader
+from data_loader import paper_id
+from resources import get_job_queue
+from utils.job_queue import ACTIVE_STATUSES, DONE
+from utils.ui import remember_papers, render_job_progress
 
 # Load environment variables
 load_dotenv()
@@ -27,43 +29,50 @@ if not groq_api_key:
     st.error("GROQ_API_KEY not found. Check your .env file.")
     st.stop()
 
-agents = ResearchAgents(groq_api_key)
-data_loader = DataLoader(search_agent=agents.summarizer_agent)
+# Reading plans are built by background jobs, so they keep running if you navigate away
+# and a topic that was already planned is shown right away. Papers and summaries from a
+# search for the same topic on the main page are reused
+jobs = get_job_queue(groq_api_key)
 
-# Run mentor plan generation
-if query:
-    with st.spinner("🧭 Finding the right papers for you..."):
-        papers = data_loader.fetch_arxiv_papers(query, limit=5)
-
-        if not papers:
-            st.error("No papers found. Try a different topic.")
-        else:
-            st.success("✅ Reading Plan Ready!")
 
-            # Generate summaries to determine survey/intro papers
-            summaries = [agents.summarize_paper(paper["summary"]) for paper in papers]
+def show_plan(plan):
+    st.subheader("📘 Suggested Reading Plan")
+    st.markdown(plan)
 
-            # Let LLM suggest an order and reasoning
-            input_message = """
-Based on these summaries, suggest a reading plan. Start with the most general or survey papers, then move to advanced or specific ones. Provide reasoning for each step:
 
-"""
-            for i, summary in enumerate(summaries):
-                input_message += f"Paper {i+1}: {summary}\n"
+# Run mentor plan generation
+if query:
+    if st.session_state.get("mentor_query") != query:
+        st.session_state["mentor_job"] = jobs.submit("reading_plan", {"query": query, "limit": 5}, max_age=24 * 3600)
+        st.session_state["mentor_query"] = query
+    job = jobs.get(st.session_state["mentor_job"])
+    if job is None:  # The job store was cleared; build the plan again
+        st.session_state.pop("mentor_query", None)
+        st.rerun()
+    result = job["result"]
 
-            mentor_plan = agents.summarizer_agent.generate_reply(
-                messages=[{"role": "user", "content": input_message}]
-            )
+    if job["status"] in ACTIVE_STATUSES:
+        # The plan is shown as it streams in
+        render_job_progress(jobs, job["id"], render_partial=lambda partial: show_plan(partial["plan"]))
+    elif job["status"] != DONE:
+        st.error(f"Reading plan {job['status']}. {job['error'] or ''}")
+        if st.button("🔁 Try again"):
+            st.session_state.pop("mentor_query", None)
+            st.rerun()
+    elif not result["papers"]:
+        st.error("No papers found. Try a different topic.")
+    else:
+        st.success("✅ Reading Plan Ready!")
+        remember_papers([paper_id(paper) for paper in result["papers"]])
 
-            # Display mentor output
-            st.subheader("📘 Suggested Reading Plan")
-            st.markdown(mentor_plan.get("content", "No plan generated."))
+        # Display mentor output
+        show_plan(result["plan"])
 
-            # Show original papers and summaries
-            st.divider()
-            for i, paper in enumerate(papers):
-                st.markdown(f"### {i+1}. {paper['title']}")
-                st.markdown(f"🔗 [Read Paper]({paper['link']})")
-                with st.expander("📄 Summary"):
-                    st.write(summaries[i])
-                st.markdown("---")
\ No newline at end of file
+        # Show original papers and summaries
+        st.divider()
+        for i, paper in enumerate(result["papers"]):
+            st.markdown(f"### {i+1}. {paper['title']}")
+            st.markdown(f"🔗 [Read Paper]({paper['link']})")
+            with st.expander("📄 Summary"):
+                st.write(result["summaries"][i])
+            st.markdown("---")
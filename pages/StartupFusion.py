@@ -1,7 +1,8 @@
 import streamlit as st
 import os
 from dotenv import load_dotenv
-from agents import ResearchAgents
+from resources import get_artifacts
+from utils.ui import recent_paper_ids
 
 # Page config
 st.set_page_config(
@@ -16,8 +17,8 @@ if not groq_api_key:
     st.error("GROQ_API_KEY is missing. Please set it in your .env file.")
     st.stop()
 
-# Initialize agents
-agents = ResearchAgents(groq_api_key)
+# Summaries and startup ideas are shared per paper with every other page
+artifacts = get_artifacts(groq_api_key)
 
 st.title("🚀 ReGenAI Fusion Agent")
 st.subheader("From Research to Startup 🚀")
@@ -31,42 +32,36 @@ Give me a paper summary or a topic, and I'll turn it into a startup idea with MV
 - "A paper summary from ArXiv on protein folding"
 """)
 
-user_input = st.text_area("Enter your research topic or paper summary:", height=200)
+PASTE = "✍️ Enter a topic or summary"
 
-if st.button("💡 Generate Startup Idea"):
-    if not user_input:
-        st.warning("Please enter a research topic or summary.")
-        st.stop()
+# Papers from this session's searches and reading plans, or free text
+titles = {record["id"]: record["title"] for record in artifacts.records(recent_paper_ids())}
+choice = st.selectbox("📄 Pick a paper from your searches:", [*titles, PASTE], format_func=lambda pid: titles.get(pid, pid))
 
-    with st.spinner("Synthesizing commercial potential..."):
-        startup_idea_prompt = f"""
-        Based on this research summary or topic:
+fusion_response = None
+if choice == PASTE:
+    user_input = st.text_area("Enter your research topic or paper summary:", height=200)
 
-        "{user_input}"
+    if st.button("💡 Generate Startup Idea"):
+        if not user_input:
+            st.warning("Please enter a research topic or summary.")
+            st.stop()
 
-        Generate the following:
-        1. Real-World Problem it solves
-        2. Bold Startup Idea (short description)
-        3. MVP Plan (Tech Stack, Tools, Dataset)
-        4. One-line Pitch for investors
-        5. Ideal VCs or funding sources
-        6. Competitive Advantage
-        7. Risk and how to mitigate it
-        Format it in a clean markdown table or bullet points.
-        """
+        with st.spinner("Synthesizing commercial potential..."):
+            fusion_response = artifacts.for_summary(user_input, "startup_idea") or "⚠️ Failed to generate response."
+else:
+    # An idea generated earlier for this paper, on any page or session, is shown right away
+    fusion_response = artifacts.stored(choice, "startup_idea")
+    if not fusion_response and st.button("💡 Generate Startup Idea"):
+        with st.spinner("Synthesizing commercial potential..."):
+            fusion_response = artifacts.get(choice, "startup_idea") or "⚠️ Failed to generate response."
 
-        fusion_response = agents.summarizer_agent.generate_reply([
-            {"role": "user", "content": startup_idea_prompt}
-        ])
+if fusion_response:
+    st.markdown(fusion_response)
 
-        if isinstance(fusion_response, dict):
-            st.markdown(fusion_response.get("content", "⚠️ Failed to generate response."))
-        else:
-            st.markdown(fusion_response)
-
-# Optional download as pitch deck
+    # Optional download as pitch deck
     with st.expander("📥 Export as Pitch Document"):
-        export_text = fusion_response.get("content", "") if isinstance(fusion_response, dict) else fusion_response
+        export_text = fusion_response
         st.download_button(
             label="📄 Download as .txt",
             data=export_text,
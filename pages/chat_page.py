@@ -10,7 +10,8 @@ st.set_page_config(
 # Other imports AFTER set_page_config
 import os
 from dotenv import load_dotenv
-from agents import ResearchAgents
+from resources import get_research_agents, get_paper_handles
+from utils.conversation import ConversationMemory
 
 # Load API Key
 load_dotenv()
@@ -20,15 +21,20 @@ if not groq_api_key:
     st.stop()
 
 # Initialize agent
-agents = ResearchAgents(groq_api_key)
+agents = get_research_agents(groq_api_key)
 
 # Get data passed from main app
 paper = st.session_state.get("selected_paper", None)
 
-params = st.experimental_get_query_params()
-title = params.get("title", [""])[0]
-summary = params.get("summary", [""])[0]
-advantages_disadvantages = params.get("adv", [""])[0]
+handle = st.query_params.get("paper", "")
+paper_record = get_paper_handles().get(handle) if handle else None
+if paper_record is None:
+    st.error("This paper link has expired or is invalid. Open the chat again from the search results.")
+    st.stop()
+
+title = paper_record["title"]
+summary = paper_record["summary"]
+advantages_disadvantages = paper_record["advantages_disadvantages"]
 
 
 # UI Layout
@@ -41,23 +47,32 @@ with st.expander("📄 Summary"):
 with st.expander("📋 Advantages & Disadvantages"):
     st.write(advantages_disadvantages)
 
-# Chat memory
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+# Chat memory, kept per paper: the full history is shown, while the prompt only carries
+# a token-bounded window of recent turns plus a rolling summary of older ones
+history_key = f"chat_history_{handle}"
+memory_key = f"chat_memory_{handle}"
+if history_key not in st.session_state:
+    st.session_state[history_key] = []
+    st.session_state[memory_key] = ConversationMemory()
+chat_history = st.session_state[history_key]
+memory = st.session_state[memory_key]
 
 # Show chat history
-for msg in st.session_state.chat_history:
+for msg in chat_history:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
 
 # User input
 user_question = st.chat_input("Ask a question about this paper")
 if user_question:
-    st.session_state.chat_history.append({"role": "user", "content": user_question})
+    chat_history.append({"role": "user", "content": user_question})
     with st.chat_message("user"):
         st.markdown(user_question)
 
-    response = agents.ask_question(summary, user_question)
-    st.session_state.chat_history.append({"role": "assistant", "content": response})
     with st.chat_message("assistant"):
-        st.markdown(response)
+        response = st.write_stream(agents.stream_question(summary, user_question, memory=memory))
+    chat_history.append({"role": "assistant", "content": response})
+
+    memory.add("user", user_question)
+    memory.add("assistant", response)
+    memory.compact(agents.compress_history)
@@ -0,0 +1,337 @@
+"""
+Research pipeline service layer: fetch -> summarize -> pros/cons -> visualize -> store.
+
+Usable from Streamlit (see resources.get_pipeline), async code, batch jobs and the
+command line:
+
+    python pipeline.py topics.txt --sources ArXiv --limit 5 --concurrency 2 --output results.jsonl
+
+The CLI processes one query per line (blank lines and lines starting with # are skipped)
+and is meant for pre-warming the corpus store, e.g. overnight for the most popular topics.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from agents import FALLBACK_TEXT, ResearchAgents, with_fallbacks, without_fallbacks
+from artifacts import PaperArtifacts
+from data_loader import DataLoader, normalize_query, paper_id
+from utils.corpus_store import CorpusStore
+from utils.metrics import metrics
+from utils.role_panel import RolePanel
+from utils.vector_index import PaperIndex
+
+DEFAULT_SOURCES = ("ArXiv",)
+QUERY_RESULTS_MAX_AGE = 6 * 3600  # A search's papers are reused by other pages for this long
+
+
+def _no_progress(fraction, message=None, partial=None):
+    pass
+
+
+def lab_roles(topic, advisor="No Advisor"):
+    """Returns Lab Mode's (heading, agent attribute, prompt) roles for `topic`."""
+    roles = [
+        # Innovator Agent
+        ("👩‍🔬 Innovator Agent Suggestions", "summarizer_agent",
+         f"You are an innovative researcher. Suggest bold, unique applications for the research topic: '{topic}'"),
+        # Professor Agent
+        ("🧑‍🏫 Professor Constraints & Ethics", "advantages_disadvantages_agent",
+         f"As a research professor, outline key constraints, assumptions, and ethical concerns with the topic: '{topic}'"),
+        # Fund Manager Agent
+        ("💼 Fund Manager Feasibility", "advantages_disadvantages_agent",
+         f"You're a research fund evaluator. Evaluate the feasibility and funding potential of a project based on the topic: '{topic}'"),
+        # Grant Pitch
+        ("📄 1-Page Grant Pitch", "summarizer_agent",
+         f"Write a 1-page research grant pitch for: '{topic}' including Problem, Novelty, ROI, and Proposed Plan."),
+        # Research Chain Planner
+        ("🧩 Research Chain Planner", "summarizer_agent",
+         f"For the topic '{topic}', create a research roadmap: list key papers, suggest experiments, a paper outline, and a 3-month timeline."),
+    ]
+    # Advisor Roleplay
+    if advisor != "No Advisor":
+        roles.append((f"🎭 Advisor: {advisor}", "summarizer_agent",
+                      f"Respond like {advisor} advising a student on the topic: '{topic}'. Include insights in their voice."))
+    return roles
+
+
+class ResearchPipeline:
+    """
+    Runs the research pipeline for a query without any UI.
+
+    Fetched papers already processed by an earlier run are read back from the corpus store;
+    only the rest go through the agents, and their results are stored for the next run.
+    """
+
+    def __init__(self, agents, data_loader, corpus=None):
+        self.agents = agents
+        self.data_loader = data_loader
+        self.corpus = corpus if corpus is not None else CorpusStore()
+        # Per-paper outputs (summaries, experiment plans, ...) shared across pages
+        self.artifacts = PaperArtifacts(self.corpus, agents)
+
+    @classmethod
+    def from_api_key(cls, api_key, max_workers=4):
+        """Builds a pipeline with its own agents, loader, paper index and corpus store."""
+        agents = ResearchAgents(api_key, max_workers=max_workers)
+        data_loader = DataLoader(search_agent=agents.summarizer_agent, paper_index=PaperIndex())
+        return cls(agents, data_loader, CorpusStore())
+
+    def fetch(self, query, sources=DEFAULT_SOURCES, limit=5):
+        """Returns the `limit` most relevant papers for `query` from `sources`."""
+        return self.data_loader.fetch_papers(query, list(sources), limit=limit, top_k=limit)
+
+    def process(self, papers, on_progress=None):
+        """
+        Returns processed papers (summary, pros/cons, visualization) in the order of `papers`.
+
+        Each new paper is stored as soon as it is processed and `on_progress(done, total)` is
+        called, so a run stopped midway (e.g. a cancelled job) keeps its finished papers.
+        Only agent outputs that succeeded are stored, so a failed field is retried by the next
+        run; in the returned papers it shows its fallback text and the paper is marked
+        "incomplete" (see agents.with_fallbacks).
+        """
+        ids = [paper_id(paper) for paper in papers]
+        stored = {pid: without_fallbacks(record) for pid, record in self.corpus.get_many(ids).items()}
+        pending = [i for i, pid in enumerate(ids) if not CorpusStore.is_processed(stored.get(pid))]
+        fresh = {}
+
+        def paper_done(j, paper):
+            i = pending[j]
+            fresh[i] = paper
+            # Failed fields are None, which leaves whatever the store already has
+            self.corpus.upsert_many([{**paper, "id": ids[i], "abstract": papers[i]["summary"]}])
+            if on_progress is not None:
+                on_progress(len(papers) - len(pending) + len(fresh), len(papers))
+
+        # Summaries for new papers are requested in batches, then pros/cons and
+        # visualization run in parallel for each of them
+        with metrics.span("process_papers"):
+            self.agents.process_papers(
+                [papers[i] for i in pending], batch_summaries=True, fallback_text=False, on_paper_done=paper_done
+            )
+        return [with_fallbacks(fresh[i] if i in fresh else stored[ids[i]]) for i in range(len(papers))]
+
+    def recent_results(self, query):
+        """
+        Returns the papers (title, link, abstract as summary) that a search for `query` found
+        within QUERY_RESULTS_MAX_AGE, or an empty list, so pages can skip fetching again.
+        """
+        ids = self.corpus.get_query_results(normalize_query(query), max_age=QUERY_RESULTS_MAX_AGE) or []
+        records = self.artifacts.records(ids)
+        if len(records) != len(ids) or not all(record.get("abstract") for record in records):
+            return []
+        return [{"title": record["title"], "link": record["link"], "summary": record["abstract"]} for record in records]
+
+    def run(self, query, sources=DEFAULT_SOURCES, limit=5, progress=None):
+        """
+        Fetches and processes papers for `query`. `progress(fraction, message, partial)` is
+        called between stages and after each processed paper (see utils.job_queue.JobQueue).
+
+        Returns:
+            list: Processed paper dictionaries (empty if no paper was found).
+        """
+        progress = progress or _no_progress
+        progress(0.05, "Fetching research papers...")
+        papers = self.fetch(query, sources, limit)
+        if not papers:
+            return []
+        progress(0.3, f"Analyzing {len(papers)} papers...", [{"title": p["title"], "link": p["link"]} for p in papers])
+        processed = self.process(papers, on_progress=lambda done, total: progress(
+            0.3 + 0.65 * done / total, f"Analyzed {done}/{total} papers..."
+        ))
+        self.corpus.set_query_results(normalize_query(query), [paper_id(paper) for paper in papers])
+        return processed
+
+    def run_many(self, queries, sources=DEFAULT_SOURCES, limit=5, concurrency=1):
+        """Runs every query, `concurrency` at a time, yielding (query, papers) in input order."""
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = [(query, pool.submit(metrics.in_trace(self.run), query, sources, limit)) for query in queries]
+            for query, future in futures:
+                yield query, future.result()
+
+    def harvest(self, query, max_results=None, batch_size=50, checkpoint=None, graph_index=None):
+        """
+        Harvests every arXiv paper for `query` (see DataLoader.harvest_arxiv) and feeds the
+        papers downstream in batches of `batch_size` as they arrive: their abstracts go to the
+        corpus store, the loader's paper index and, if given, a KeywordGraphIndex.
+        Yields each batch once stored, so callers can report progress or stop early.
+        """
+        def flush(batch):
+            self.corpus.upsert_many([
+                {"id": paper_id(paper), "link": paper["link"], "title": paper["title"], "abstract": paper["summary"]}
+                for paper in batch
+            ])
+            if self.data_loader.paper_index is not None:
+                self.data_loader.paper_index.add(batch, paper_id)
+            if graph_index is not None:
+                graph_index.add_papers(batch)
+
+        batch = []
+        for paper in self.data_loader.harvest_arxiv(query, max_results=max_results, checkpoint=checkpoint):
+            batch.append(paper)
+            if len(batch) >= batch_size:
+                flush(batch)
+                yield batch
+                batch = []
+        if batch:
+            flush(batch)
+            yield batch
+
+    def reading_plan(self, query, limit=5, progress=None):
+        """
+        Builds Research Mentor Mode's reading plan for `query`: fetches arXiv papers, summarizes
+        those without a stored summary, then asks for a reading order. The plan is reported as
+        partial output while it streams in.
+
+        Returns:
+            dict: {"papers": [...], "summaries": [...], "plan": str}, with no papers if none were found.
+        """
+        progress = progress or _no_progress
+        progress(0.05, "Finding the right papers for you...")
+        papers = self.recent_results(query)[:limit] or self.data_loader.fetch_arxiv_papers(query, limit=limit)
+        if not papers:
+            return {"papers": [], "summaries": [], "plan": ""}
+        papers = [{"title": p["title"], "link": p["link"], "summary": p["summary"]} for p in papers]
+
+        # Summaries determine the survey/intro papers; stored ones are reused
+        progress(0.2, "Summarizing papers...")
+        ids = [paper_id(paper) for paper in papers]
+        stored = self.corpus.get_many(ids)
+        summaries = [without_fallbacks(stored.get(pid) or {}).get("summary") for pid in ids]
+        pending = [i for i, summary in enumerate(summaries) if not summary]
+        for i, summary in zip(pending, self.agents.summarize_papers([papers[i]["summary"] for i in pending], default=None)):
+            summaries[i] = summary
+        # Failed summaries are stored as None, so the next plan retries them
+        self.corpus.upsert_many([
+            {"id": ids[i], "title": papers[i]["title"], "link": papers[i]["link"],
+             "abstract": papers[i]["summary"], "summary": summaries[i]}
+            for i in pending
+        ])
+        self.corpus.set_query_results(normalize_query(query), ids)
+        summaries = [summary or FALLBACK_TEXT["summary"] for summary in summaries]
+
+        # Let LLM suggest an order and reasoning
+        prompt = (
+            "\nBased on these summaries, suggest a reading plan. Start with the most general or survey papers, "
+            "then move to advanced or specific ones. Provide reasoning for each step:\n\n"
+        )
+        for i, summary in enumerate(summaries):
+            prompt += f"Paper {i+1}: {summary}\n"
+
+        plan, reported = "", 0.0
+        for chunk in self.agents.stream_agent(self.agents.summarizer_agent, prompt, "No plan generated."):
+            plan += chunk
+            if time.monotonic() - reported > 0.5:  # Throttle progress writes while streaming
+                reported = time.monotonic()
+                progress(0.6, "Writing your reading plan...", {"papers": papers, "summaries": summaries, "plan": plan})
+        return {"papers": papers, "summaries": summaries, "plan": plan}
+
+    def lab_analysis(self, topic, advisor="No Advisor", progress=None):
+        """
+        Runs every Lab Mode role for `topic` concurrently. Answers are streamed: the partial
+        output holds each role's text so far and is reported as it grows.
+
+        Returns:
+            dict: {heading: answer} for the roles in lab_roles(topic, advisor).
+        """
+        progress = progress or _no_progress
+        roles = lab_roles(topic, advisor)
+        panel = RolePanel(max_workers=len(roles))
+        for heading, agent_name, prompt in roles:
+            agent = getattr(self.agents, agent_name)
+            panel.add(heading, lambda _, agent=agent, prompt=prompt: self.agents.stream_agent(agent, prompt, "-"), stream=True)
+
+        answers, finished, reported = {}, 0, 0.0
+        progress(0.0, "Thinking...")
+        for heading, text, done in panel.stream():
+            answers[heading] = text
+            finished += done
+            if done or time.monotonic() - reported > 0.5:  # Throttle progress writes while streaming
+                reported = time.monotonic()
+                progress(finished / len(roles), f"{finished}/{len(roles)} roles done", answers)
+        return answers
+
+    async def arun(self, query, sources=DEFAULT_SOURCES, limit=5):
+        """Async variant of run; the work happens on a worker thread."""
+        return await asyncio.to_thread(self.run, query, sources, limit)
+
+    async def arun_many(self, queries, sources=DEFAULT_SOURCES, limit=5, concurrency=1):
+        """Async variant of run_many, returning a list of (query, papers) in input order."""
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def run_one(query):
+            async with semaphore:
+                return query, await self.arun(query, sources, limit)
+
+        return await asyncio.gather(*(run_one(query) for query in queries))
+
+
+def read_queries(path):
+    """Returns the queries in `path`, one per line, skipping blanks and # comments."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def harvest_queries(pipeline, queries, max_results, checkpoint_dir=None):
+    """Harvests each query in turn, printing progress as batches are stored."""
+    if checkpoint_dir:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    for query in queries:
+        checkpoint = None
+        if checkpoint_dir:
+            name = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()[:16]
+            checkpoint = os.path.join(checkpoint_dir, f"{name}.json")
+        harvested = 0
+        for batch in pipeline.harvest(query, max_results=max_results, checkpoint=checkpoint):
+            harvested += len(batch)
+            print(f"{query}: {harvested} papers stored")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fetch and process papers for a file of research queries.")
+    parser.add_argument("queries", help="Text file with one query per line")
+    parser.add_argument("--sources", nargs="+", default=list(DEFAULT_SOURCES), help="Paper sources to search")
+    parser.add_argument("--limit", type=int, default=5, help="Papers per query")
+    parser.add_argument("--concurrency", type=int, default=1, help="Queries processed at once")
+    parser.add_argument("--output", help="Write one JSON line per query to this file")
+    parser.add_argument("--harvest", type=int, metavar="N",
+                        help="Instead of processing the top papers, store up to N arXiv papers per query (abstracts only)")
+    parser.add_argument("--checkpoint-dir", help="With --harvest, resume each query from a checkpoint kept in this directory")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        parser.error("GROQ_API_KEY is missing. Please set it in your environment variables.")
+
+    pipeline = ResearchPipeline.from_api_key(api_key)
+    queries = read_queries(args.queries)
+    if args.harvest:
+        return harvest_queries(pipeline, queries, args.harvest, args.checkpoint_dir)
+    output = open(args.output, "w", encoding="utf-8") if args.output else None
+    failed = 0
+    try:
+        started = time.perf_counter()
+        for query, papers in pipeline.run_many(queries, args.sources, args.limit, args.concurrency):
+            print(f"{query}: {len(papers)} papers")
+            failed += not papers
+            if output:
+                output.write(json.dumps({"query": query, "papers": papers}) + "\n")
+        print(f"Processed {len(queries)} queries in {time.perf_counter() - started:.1f}s")
+    finally:
+        if output:
+            output.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
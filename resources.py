@@ -0,0 +1,94 @@
+import os
+
+import streamlit as st
+from agents import ResearchAgents
+from data_loader import DataLoader
+from pipeline import ResearchPipeline
+from utils.corpus_store import CorpusStore
+from utils.job_queue import JobQueue
+from utils.paper_handles import PaperHandleStore
+from utils.vector_index import PaperIndex
+from utils.viz_sandbox import VisualizationRenderer
+
+
+# Process-wide factories: Streamlit re-executes app.py and pages/ on every interaction,
+# so agents, LLM clients and loaders are built once per config and shared across sessions.
+
+# Job queues built so far, closed when the resources are invalidated
+_job_queues = []
+
+
+@st.cache_resource(show_spinner=False)
+def get_research_agents(api_key, max_workers=4):
+    """Returns the shared ResearchAgents for this API key."""
+    return ResearchAgents(api_key, max_workers=max_workers)
+
+
+@st.cache_resource(show_spinner=False)
+def get_paper_index():
+    """Returns the shared on-disk vector index of every paper fetched so far."""
+    return PaperIndex()
+
+
+@st.cache_resource(show_spinner=False)
+def get_corpus_store():
+    """Returns the shared persistent store of processed papers."""
+    return CorpusStore()
+
+
+@st.cache_resource(show_spinner=False)
+def get_paper_handles():
+    """Returns the shared store resolving short paper handles used in chat links."""
+    return PaperHandleStore()
+
+
+@st.cache_resource(show_spinner=False)
+def get_data_loader(api_key):
+    """Returns the shared DataLoader whose query expansion uses the shared summarizer agent."""
+    return DataLoader(search_agent=get_research_agents(api_key).summarizer_agent, paper_index=get_paper_index())
+
+
+@st.cache_resource(show_spinner=False)
+def get_visualization_renderer():
+    """Returns the shared sandboxed renderer for generated chart code."""
+    return VisualizationRenderer()
+
+
+@st.cache_resource(show_spinner=False)
+def get_pipeline(api_key):
+    """Returns the shared ResearchPipeline built on the shared agents, loader and corpus store."""
+    return ResearchPipeline(get_research_agents(api_key), get_data_loader(api_key), get_corpus_store())
+
+
+@st.cache_resource(show_spinner=False)
+def get_job_queue(api_key):
+    """
+    Returns the shared background job queue running the pipeline's long jobs, with at most
+    REGENAI_MAX_JOBS (default 2) jobs running at once on this server.
+    """
+    pipeline = get_pipeline(api_key)
+    queue = JobQueue(max_workers=int(os.getenv("REGENAI_MAX_JOBS", "2")))
+    queue.register("research", pipeline.run)
+    queue.register("reading_plan", pipeline.reading_plan)
+    queue.register("lab_analysis", pipeline.lab_analysis)
+    _job_queues.append(queue)
+    return queue
+
+
+def get_artifacts(api_key):
+    """Returns the shared per-paper artifact layer (summaries, pros/cons, experiment plans, ...)."""
+    return get_pipeline(api_key).artifacts
+
+
+def invalidate_resources():
+    """Drops every cached agent and loader so the next call rebuilds them (e.g. after a key change)."""
+    get_research_agents.clear()
+    get_paper_index.clear()
+    get_corpus_store.clear()
+    get_paper_handles.clear()
+    get_data_loader.clear()
+    get_pipeline.clear()
+    get_visualization_renderer.clear()
+    get_job_queue.clear()
+    while _job_queues:
+        _job_queues.pop().close()
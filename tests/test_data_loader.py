@@ -0,0 +1,72 @@
+import pytest
+
+from benchmarks.stub_arxiv_server import StubArxivServer
+from data_loader import DataLoader, dedupe_papers
+from utils.http_client import CachedHttpClient, RateLimiter
+
+
+@pytest.fixture(scope="module")
+def server():
+    with StubArxivServer() as stub:
+        yield stub
+
+
+@pytest.fixture
+def loader(server):
+    return DataLoader(
+        http_client=CachedHttpClient(cache=False, rate_limiter=RateLimiter(interval=0)),
+        arxiv_url=server.url,
+    )
+
+
+def test_fetch_arxiv_papers_parses_the_feed(loader):
+    papers = loader.fetch_arxiv_papers("graph neural networks")
+
+    assert len(papers) == 5
+    assert all(paper["title"] and paper["summary"] and paper["link"].startswith("http") for paper in papers)
+    assert all("graph neural networks" in paper["title"] for paper in papers)
+
+
+def test_fetch_arxiv_papers_respects_limit(loader):
+    assert len(loader.fetch_arxiv_papers("transformers", limit=2)) == 2
+
+
+def test_fetch_papers_tags_sources(loader):
+    papers = loader.fetch_papers("protein folding", ["ArXiv"], limit=5)
+
+    assert papers and all(paper["sources"] == ["ArXiv"] for paper in papers)
+
+
+def test_harvest_pages_through_every_result(loader, server):
+    papers = list(loader.harvest_arxiv("diffusion models", page_size=2, delay=0))
+
+    assert len(papers) == server.total_results
+    assert len({paper["link"] for paper in papers}) == server.total_results
+
+
+def test_harvest_resumes_from_checkpoint(loader, tmp_path):
+    checkpoint = str(tmp_path / "harvest.json")
+    first = []
+    for paper in loader.harvest_arxiv("reinforcement learning", max_results=10, page_size=2, checkpoint=checkpoint, delay=0):
+        first.append(paper)
+        if len(first) == 3:
+            break  # Interrupted during the second page; the first one is checkpointed
+
+    rest = list(loader.harvest_arxiv("reinforcement learning", max_results=10, page_size=2, checkpoint=checkpoint, delay=0))
+
+    # The partially read page is harvested again
+    assert len(rest) == 8
+    assert rest[0]["link"] == first[2]["link"]
+    assert {paper["link"] for paper in first[:2]}.isdisjoint(paper["link"] for paper in rest)
+
+
+def test_dedupe_merges_papers_found_by_several_sources():
+    paper = {"title": "Attention Is All You Need", "summary": "The dominant sequence transduction models.",
+             "link": "http://arxiv.org/abs/1706.03762v5", "sources": ["ArXiv"]}
+    duplicate = {**paper, "title": "Attention is all you need.", "link": "https://arxiv.org/abs/1706.03762",
+                 "sources": ["Google Scholar"]}
+
+    merged = dedupe_papers([paper, duplicate])
+
+    assert len(merged) == 1
+    assert merged[0]["sources"] == ["ArXiv", "Google Scholar"]
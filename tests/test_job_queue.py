@@ -0,0 +1,33 @@
+import threading
+
+import pytest
+
+from utils.job_queue import DONE, QUEUED, JobQueue
+
+
+def test_close_stops_the_heartbeat_and_the_workers():
+    queue = JobQueue(":memory:", max_workers=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(progress):
+        started.set()
+        release.wait(5)
+        return "slow"
+
+    queue.register("slow", slow)
+    queue.register("echo", lambda value, progress: value)
+    running = queue.submit("slow", {})
+    assert started.wait(5)
+    waiting = queue.submit("echo", {"value": 1})
+
+    queue.close()
+    release.set()
+
+    heartbeat = next(t for t in threading.enumerate() if t.name == "job-heartbeat")
+    heartbeat.join(5)
+    assert not heartbeat.is_alive()
+    queue._pool.shutdown(wait=True)
+    assert queue.get(running)["status"] == DONE
+    assert queue.get(waiting)["status"] == QUEUED  # Left for the next queue to take over
+    with pytest.raises(RuntimeError):
+        queue.submit("echo", {"value": 2})
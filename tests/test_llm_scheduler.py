@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from utils.llm_scheduler import BACKGROUND, INTERACTIVE, LLMScheduler
+from utils.mock_llm import MockLLM, MockRateLimitError
+
+MESSAGES = [{"role": "user", "content": "Summarize this paper"}]
+
+
+def test_interactive_requests_are_served_before_background_ones():
+    # The token budget is spent, so both requests queue until it refills (10 tokens per second)
+    scheduler = LLMScheduler(requests_per_minute=10**6, tokens_per_minute=600)
+    scheduler.acquire(600)
+    order = []
+
+    def request(name, priority):
+        scheduler.acquire(5, priority)
+        order.append(name)
+
+    threads = [threading.Thread(target=request, args=("background", BACKGROUND))]
+    threads[0].start()
+    time.sleep(0.05)  # The background request is queued first
+    threads.append(threading.Thread(target=request, args=("interactive", INTERACTIVE)))
+    threads[1].start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert order == ["interactive", "background"]
+
+
+def test_identical_requests_in_flight_share_one_call():
+    scheduler = LLMScheduler(requests_per_minute=10**6, tokens_per_minute=10**9)
+    llm = MockLLM(first_token_delay=0.2)
+    results = []
+
+    def ask():
+        results.append(scheduler.call(lambda: llm.complete("system", MESSAGES), key="same prompt"))
+
+    threads = [threading.Thread(target=ask) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert llm.calls == 1
+    assert len(results) == 4 and len(set(results)) == 1
+
+
+def test_rate_limit_errors_are_retried_with_backoff():
+    scheduler = LLMScheduler(requests_per_minute=10**6, tokens_per_minute=10**9, max_retries=3)
+    llm = MockLLM(requests_per_minute=1)
+    llm.complete("system", MESSAGES)  # Uses up this minute's only request
+    delays = []
+
+    def backoff(attempt):
+        delays.append(attempt)
+        llm._window.clear()  # The backend's minute has passed by the time the retry runs
+        return 0.0
+
+    scheduler.backoff = backoff
+    reply = scheduler.call(lambda: llm.complete("system", MESSAGES))
+
+    assert reply.startswith("Mock response")
+    assert delays == [0]
+    assert llm.rejected == 1
+
+
+def test_non_retryable_errors_are_raised_at_once():
+    scheduler = LLMScheduler(requests_per_minute=10**6, tokens_per_minute=10**9, max_retries=3)
+    attempts = []
+
+    def fail():
+        attempts.append(1)
+        raise ValueError("400 Bad Request")
+
+    with pytest.raises(ValueError):
+        scheduler.call(fail)
+    assert len(attempts) == 1
+
+
+def test_rate_limit_errors_are_raised_once_retries_are_used_up():
+    scheduler = LLMScheduler(requests_per_minute=10**6, tokens_per_minute=10**9, max_retries=2)
+    scheduler.backoff = lambda attempt: 0.0
+    llm = MockLLM(requests_per_minute=1)
+    llm.complete("system", MESSAGES)
+
+    with pytest.raises(MockRateLimitError):
+        scheduler.call(lambda: llm.complete("system", MESSAGES))
+    assert llm.rejected == 3
+
+
+def test_requests_wait_for_the_token_budget():
+    # 600 tokens per minute refill at 10 tokens per second
+    scheduler = LLMScheduler(requests_per_minute=10**6, tokens_per_minute=600)
+    scheduler.acquire(600)
+    started = time.monotonic()
+    scheduler.acquire(5)
+
+    assert 0.4 <= time.monotonic() - started < 2.0
+
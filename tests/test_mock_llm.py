@@ -0,0 +1,67 @@
+import pytest
+
+from agents import ResearchAgents
+from utils.llm_scheduler import LLMScheduler
+from utils.mock_llm import MockAssistantAgent, MockLLM, MockRateLimitError
+
+
+def make_agents(llm, max_retries=0):
+    return ResearchAgents(
+        "mock",
+        cache=False,
+        stream_client=llm,
+        scheduler=LLMScheduler(requests_per_minute=10**6, tokens_per_minute=10**9, max_retries=max_retries),
+        agent_cls=MockAssistantAgent,
+        agent_kwargs={"llm": llm},
+    )
+
+
+def test_streamed_reply_matches_the_complete_reply():
+    llm = MockLLM()
+    messages = [{"role": "user", "content": "Explain graph neural networks"}]
+
+    assert "".join(llm.stream("system", messages)) == llm.complete("system", messages)
+    assert llm.calls == 2
+
+
+def test_requests_over_the_limit_are_rejected():
+    llm = MockLLM(requests_per_minute=2)
+    messages = [{"role": "user", "content": "hello"}]
+    llm.complete("system", messages)
+    llm.complete("system", messages)
+
+    with pytest.raises(MockRateLimitError):
+        llm.complete("system", messages)
+    assert llm.rejected == 1
+
+
+def test_token_limit_counts_prompt_tokens():
+    llm = MockLLM(tokens_per_minute=10)
+    with pytest.raises(MockRateLimitError):
+        llm.complete("system", [{"role": "user", "content": "x" * 100}])
+
+
+def test_agents_share_one_per_key_limit():
+    # Like Groq, the limit applies to the API key, whichever agent sends the request
+    llm = MockLLM(requests_per_minute=3)
+    agents = make_agents(llm)
+    agents.ask_agent(agents.summarizer_agent, "first prompt")
+    agents.ask_agent(agents.advantages_disadvantages_agent, "second prompt")
+    next(agents.stream_agent(agents.visualization_agent, "third prompt"))
+
+    with pytest.raises(MockRateLimitError):
+        agents.ask_agent(agents.summarizer_agent, "fourth prompt")
+
+
+def test_rate_limited_stage_marks_only_its_paper_incomplete():
+    llm = MockLLM(requests_per_minute=4)
+    agents = make_agents(llm)
+    papers = [{"title": f"Paper {i}", "link": f"http://arxiv.org/abs/2401.0000{i}v1", "summary": f"Abstract {i}"}
+              for i in range(2)]
+
+    processed = agents.process_papers(papers, max_workers=1, fallback_text=False)
+
+    # Two summaries and two of the four analysis stages fit in the limit
+    fields = [paper[field] for paper in processed for field in ("summary", "advantages_disadvantages", "visualization")]
+    assert all(paper["summary"] for paper in processed)
+    assert sum(value is None for value in fields) == 2
@@ -0,0 +1,52 @@
+from functools import lru_cache
+
+from utils.prompt_packing import count_tokens, truncate_to_tokens
+
+
+@lru_cache(maxsize=128)
+def paper_context_prefix(paper_summary, max_tokens=1500):
+    """Builds (once per paper) the prompt prefix that grounds every chat turn in the paper."""
+    return f"Based on this paper:\n\n{truncate_to_tokens(paper_summary, max_tokens)}\n\n"
+
+
+class ConversationMemory:
+    """
+    Chat memory with a bounded prompt footprint.
+
+    The most recent turns are kept verbatim up to `window_tokens`; older turns are folded
+    into a rolling summary by `compact`, so the context sent per turn stays roughly flat.
+    """
+
+    def __init__(self, window_tokens=1200, summary_words=150):
+        self.window_tokens = window_tokens
+        self.summary_words = summary_words
+        self.summary = ""
+        self.recent = []  # [(role, content, tokens)]
+
+    def add(self, role, content):
+        self.recent.append((role, content, count_tokens(content)))
+
+    def window_size(self):
+        return sum(tokens for _, _, tokens in self.recent)
+
+    def compact(self, summarize):
+        """
+        Moves the oldest turns out of the window until it fits, folding them into the summary
+        with `summarize(previous_summary, turns, max_words)`, which returns the new summary text.
+        """
+        evicted = []
+        while len(self.recent) > 2 and self.window_size() > self.window_tokens:
+            role, content, _ = self.recent.pop(0)
+            evicted.append((role, content))
+        if evicted:
+            self.summary = summarize(self.summary, evicted, self.summary_words)
+
+    def render(self):
+        """Returns the conversation context to place before a new question, or an empty string."""
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        if self.recent:
+            turns = "\n".join(f"{role.capitalize()}: {content}" for role, content, _ in self.recent)
+            parts.append(f"Recent conversation:\n{turns}")
+        return "\n\n".join(parts) + "\n\n" if parts else ""
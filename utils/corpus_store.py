@@ -0,0 +1,166 @@
+import json
+import sqlite3
+import time
+
+from utils.storage import SQLiteStore, cache_path
+
+DEFAULT_CORPUS_PATH = cache_path("corpus.sqlite3", "REGENAI_CORPUS_DB")
+
+# Columns stored per paper, besides the id
+FIELDS = ("link", "title", "abstract", "summary", "advantages_disadvantages", "visualization")
+
+# Fields every processed paper has once all agents ran on it
+PROCESSED_FIELDS = ("summary", "advantages_disadvantages", "visualization")
+
+
+class CorpusStore(SQLiteStore):
+    """
+    Persistent store of papers and their agent outputs, shared by every session.
+
+    Papers are keyed by a stable id (see data_loader.paper_id). Upserts only overwrite
+    fields that are given, so partial results (e.g. just a summary) can be merged later.
+    Title, abstract and summary are full-text indexed with FTS5 when SQLite supports it.
+    Other per-paper outputs are kept as named artifacts, and the paper ids found for each
+    query are recorded so a search done on one page can be reused by another.
+    """
+
+    def __init__(self, path=DEFAULT_CORPUS_PATH):
+        super().__init__(path)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS papers ("
+            " id TEXT PRIMARY KEY, link TEXT, title TEXT, abstract TEXT, summary TEXT,"
+            " advantages_disadvantages TEXT, visualization TEXT, updated_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_papers_title ON papers(title COLLATE NOCASE)")
+        # Further per-paper agent outputs (e.g. experiment plans), keyed by paper id and kind
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " paper_id TEXT NOT NULL, kind TEXT NOT NULL, value TEXT, updated_at REAL,"
+            " PRIMARY KEY (paper_id, kind))"
+        )
+        # Paper ids found for each normalized query, so other pages can reuse a search
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_results (query TEXT PRIMARY KEY, paper_ids TEXT NOT NULL, updated_at REAL)"
+        )
+        self.has_fts = self._create_fts()
+        self._conn.commit()
+
+    def _create_fts(self):
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5("
+                " title, abstract, summary, content='papers', content_rowid='rowid')"
+            )
+        except sqlite3.OperationalError:
+            return False  # SQLite built without FTS5; search falls back to LIKE
+        self._conn.executescript(
+            """
+            CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+                INSERT INTO papers_fts(rowid, title, abstract, summary) VALUES (new.rowid, new.title, new.abstract, new.summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+                INSERT INTO papers_fts(papers_fts, rowid, title, abstract, summary) VALUES ('delete', old.rowid, old.title, old.abstract, old.summary);
+            END;
+            CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+                INSERT INTO papers_fts(papers_fts, rowid, title, abstract, summary) VALUES ('delete', old.rowid, old.title, old.abstract, old.summary);
+                INSERT INTO papers_fts(rowid, title, abstract, summary) VALUES (new.rowid, new.title, new.abstract, new.summary);
+            END;
+            """
+        )
+        return True
+
+    @staticmethod
+    def is_processed(record):
+        """True when a stored record has every agent output."""
+        return bool(record) and all(record.get(field) for field in PROCESSED_FIELDS)
+
+    def upsert_many(self, records):
+        """Inserts or updates records (dicts with an `id` and any of FIELDS) in one transaction."""
+        now = time.time()
+        rows = [(record["id"], *(record.get(field) for field in FIELDS), now) for record in records]
+        updates = ", ".join(f"{field} = COALESCE(excluded.{field}, papers.{field})" for field in FIELDS)
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT INTO papers (id, {', '.join(FIELDS)}, updated_at) VALUES ({', '.join('?' * (len(FIELDS) + 2))})"
+                f" ON CONFLICT(id) DO UPDATE SET {updates}, updated_at = excluded.updated_at",
+                rows,
+            )
+            self._conn.commit()
+
+    def get(self, paper_id):
+        return self.get_many([paper_id]).get(paper_id)
+
+    def get_many(self, paper_ids):
+        """Returns {id: record} for the ids that are stored."""
+        paper_ids = list(dict.fromkeys(paper_ids))
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(paper_ids), 500):
+                chunk = paper_ids[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT * FROM papers WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                found.update((row["id"], dict(row)) for row in rows)
+        return found
+
+    def search(self, text, limit=10):
+        """Returns records whose title, abstract or summary match `text`, best matches first."""
+        terms = [term for term in "".join(c if c.isalnum() else " " for c in text).split() if term]
+        if not terms:
+            return []
+        with self._lock:
+            if self.has_fts:
+                match = " OR ".join(f'"{term}"' for term in terms)
+                rows = self._conn.execute(
+                    "SELECT papers.* FROM papers_fts JOIN papers ON papers.rowid = papers_fts.rowid"
+                    " WHERE papers_fts MATCH ? ORDER BY bm25(papers_fts) LIMIT ?",
+                    (match, limit),
+                ).fetchall()
+            else:
+                clause = " OR ".join("title LIKE ?" for _ in terms)
+                rows = self._conn.execute(
+                    f"SELECT * FROM papers WHERE {clause} ORDER BY updated_at DESC LIMIT ?",
+                    (*(f"%{term}%" for term in terms), limit),
+                ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_artifact(self, paper_id, kind):
+        """Returns the stored `kind` artifact of a paper, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM artifacts WHERE paper_id = ? AND kind = ?", (paper_id, kind)
+            ).fetchone()
+        return row["value"] if row else None
+
+    def put_artifact(self, paper_id, kind, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts (paper_id, kind, value, updated_at) VALUES (?, ?, ?, ?)",
+                (paper_id, kind, value, time.time()),
+            )
+            self._conn.commit()
+
+    def set_query_results(self, query, paper_ids):
+        """Records the papers found for `query` (normalized by the caller)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_results (query, paper_ids, updated_at) VALUES (?, ?, ?)",
+                (query, json.dumps(list(paper_ids)), time.time()),
+            )
+            self._conn.commit()
+
+    def get_query_results(self, query, max_age=None):
+        """Returns the paper ids recorded for `query`, or None if unknown or older than `max_age` seconds."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT paper_ids, updated_at FROM query_results WHERE query = ?", (query,)
+            ).fetchone()
+        if row is None or (max_age is not None and time.time() - row["updated_at"] > max_age):
+            return None
+        return json.loads(row["paper_ids"])
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
@@ -1,35 +1,191 @@
+import hashlib
+import threading
+from collections import OrderedDict
 import networkx as nx
 from pyvis.network import Network
+from networkx.algorithms.community import louvain_communities
 from rake_nltk import Rake
-import tempfile
 import streamlit as st
+from utils.metrics import metrics
+
+# A single Rake instance (stopwords and punctuation loaded once); Rake keeps per-call
+# state on the instance, so extraction is serialized with a lock
+_rake = None
+_rake_lock = threading.Lock()
+
+# Keyword extraction results keyed by (content hash, max_keywords), least recently used evicted first
+_keyword_cache = OrderedDict()
+_KEYWORD_CACHE_SIZE = 10000
+
+# Rendered HTML keyed by graph fingerprint and render options
+_render_cache = OrderedDict()
+_RENDER_CACHE_SIZE = 32
+_render_lock = threading.Lock()
+
+
+def _content_hash(text):
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
 
 def extract_keywords(text, max_keywords=5):
-    rake = Rake()
-    rake.extract_keywords_from_text(text)
-    keywords = rake.get_ranked_phrases()[:max_keywords]
+    global _rake
+    key = (_content_hash(text), max_keywords)
+    with _rake_lock:
+        if key in _keyword_cache:
+            _keyword_cache.move_to_end(key)
+            return list(_keyword_cache[key])
+        if _rake is None:
+            _rake = Rake()
+        _rake.extract_keywords_from_text(text)
+        keywords = _rake.get_ranked_phrases()[:max_keywords]
+        _keyword_cache[key] = tuple(keywords)
+        if len(_keyword_cache) > _KEYWORD_CACHE_SIZE:
+            _keyword_cache.popitem(last=False)
     return keywords
 
+
+class KeywordGraphIndex:
+    """
+    Keyword co-occurrence graph that grows incrementally.
+
+    Papers already indexed (by summary content hash) are skipped. Node attribute `count`
+    is the number of papers mentioning a keyword; edge attribute `weight` is the number
+    of papers in which two keywords co-occur.
+    """
+
+    def __init__(self, max_keywords_per_paper=5):
+        self.max_keywords_per_paper = max_keywords_per_paper
+        self.graph = nx.Graph()
+        self._indexed = set()
+
+    def __len__(self):
+        return len(self._indexed)
+
+    def add_papers(self, papers):
+        """Adds the papers not yet indexed and returns how many were new."""
+        with metrics.span("graph_build"):
+            return self._add_papers(papers)
+
+    def _add_papers(self, papers):
+        added = 0
+        for paper in papers:
+            text = paper["summary"]
+            digest = _content_hash(text)
+            if digest in self._indexed:
+                continue
+            self._indexed.add(digest)
+            added += 1
+
+            keywords = extract_keywords(text, max_keywords=self.max_keywords_per_paper)
+            for kw in keywords:
+                if self.graph.has_node(kw):
+                    self.graph.nodes[kw]["count"] += 1
+                else:
+                    self.graph.add_node(kw, count=1)
+            for i in range(len(keywords)):
+                for j in range(i + 1, len(keywords)):
+                    if self.graph.has_edge(keywords[i], keywords[j]):
+                        self.graph[keywords[i]][keywords[j]]["weight"] += 1
+                    else:
+                        self.graph.add_edge(keywords[i], keywords[j], weight=1)
+        return added
+
+
 def build_keyword_graph(papers, max_keywords_per_paper=5):
-    G = nx.Graph()
-
-    for paper in papers:
-        text = paper["summary"]
-        keywords = extract_keywords(text, max_keywords=max_keywords_per_paper)
-        for kw in keywords:
-            G.add_node(kw)
-        for i in range(len(keywords)):
-            for j in range(i + 1, len(keywords)):
-                G.add_edge(keywords[i], keywords[j])
-
-    return G
-
-def visualize_graph_pyvis(G, heading="🧠 Topic Network Graph"):
-    net = Network(height="500px", width="100%", bgcolor="#ffffff", font_color="black")
-    net.from_nx(G)
-
-    # Save as HTML and display in Streamlit
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp_file:
-        net.save_graph(tmp_file.name)
-        st.markdown(f"### {heading}")
-        st.components.v1.html(open(tmp_file.name, 'r', encoding='utf-8').read(), height=550)
+    index = KeywordGraphIndex(max_keywords_per_paper=max_keywords_per_paper)
+    index.add_papers(papers)
+    return index.graph
+
+def graph_fingerprint(G):
+    """Returns a stable hash of a graph's nodes, edges, counts and weights."""
+    digest = hashlib.sha1()
+    for node, count in sorted((str(node), data.get("count", 1)) for node, data in G.nodes(data=True)):
+        digest.update(f"{node}\0{count}\1".encode("utf-8"))
+    edges = sorted((*sorted((str(u), str(v))), data.get("weight", 1)) for u, v, data in G.edges(data=True))
+    for u, v, weight in edges:
+        digest.update(f"{u}\0{v}\0{weight}\2".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def prune_graph(G, top_k=None, by="degree"):
+    """Keeps only the `top_k` nodes ranked by degree, or by weighted degree when by="weight"."""
+    if top_k is None or G.number_of_nodes() <= top_k:
+        return G
+    scores = G.degree(weight="weight" if by == "weight" else None)
+    keep = [node for node, _ in sorted(scores, key=lambda item: item[1], reverse=True)[:top_k]]
+    return G.subgraph(keep).copy()
+
+
+def collapse_communities(G, seed=0):
+    """
+    Collapses each Louvain community into one node labelled by its best-connected keyword.
+    Edge weights between communities are summed; node `count` is the community's total count.
+    """
+    communities = louvain_communities(G, weight="weight", seed=seed)
+    C = nx.Graph()
+    owner = {}
+    for members in communities:
+        lead = max(members, key=lambda node: G.degree(node, weight="weight"))
+        label = f"{lead} (+{len(members) - 1})" if len(members) > 1 else lead
+        C.add_node(
+            label,
+            count=sum(G.nodes[node].get("count", 1) for node in members),
+            title=", ".join(sorted(members)[:25]),
+        )
+        for node in members:
+            owner[node] = label
+    for u, v, data in G.edges(data=True):
+        a, b = owner[u], owner[v]
+        if a == b:
+            continue
+        if C.has_edge(a, b):
+            C[a][b]["weight"] += data.get("weight", 1)
+        else:
+            C.add_edge(a, b, weight=data.get("weight", 1))
+    return C
+
+
+def render_graph_html(G, height="500px", physics_threshold=300):
+    """
+    Renders a graph to standalone pyvis HTML in memory, cached by graph fingerprint.
+    Physics is disabled above `physics_threshold` nodes so large graphs stay responsive.
+    """
+    key = (graph_fingerprint(G), height, physics_threshold)
+    with _render_lock:
+        if key in _render_cache:
+            _render_cache.move_to_end(key)
+            metrics.increment("graph_render_cache_hits")
+            return _render_cache[key]
+    metrics.increment("graph_render_cache_misses")
+
+    with metrics.span("graph_render"):
+        html = _render_html(G, height, physics_threshold)
+
+    with _render_lock:
+        _render_cache[key] = html
+        if len(_render_cache) > _RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return html
+
+
+def _render_html(G, height, physics_threshold):
+    net = Network(height=height, width="100%", bgcolor="#ffffff", font_color="black")
+    for node, data in G.nodes(data=True):
+        net.add_node(str(node), label=str(node), value=data.get("count", 1), title=data.get("title", str(node)))
+    for u, v, data in G.edges(data=True):
+        net.add_edge(str(u), str(v), value=data.get("weight", 1))
+    net.toggle_physics(G.number_of_nodes() <= physics_threshold)
+    return net.generate_html()
+
+
+def visualize_graph_pyvis(G, heading="🧠 Topic Network Graph", top_k=None, by="degree", collapse=False):
+    """
+    Displays the graph in Streamlit without writing temp files.
+    Large graphs can be reduced by collapsing communities and/or keeping the top_k nodes.
+    """
+    if collapse and G.number_of_nodes() > 0:
+        G = collapse_communities(G)
+    G = prune_graph(G, top_k=top_k, by=by)
+
+    st.markdown(f"### {heading}")
+    st.components.v1.html(render_graph_html(G), height=550)
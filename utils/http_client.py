@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils.metrics import metrics
+from utils.storage import cache_path
+
+DEFAULT_HTTP_CACHE_DIR = cache_path("http", "REGENAI_HTTP_CACHE")
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket: allows bursts of up to `burst` requests and
+    refills one token every `interval` seconds.
+    """
+
+    def __init__(self, interval=3.0, burst=1):
+        self.interval = interval
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a request may be sent."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.interval > 0:
+                    self._tokens = min(self.burst, self._tokens + (now - self._updated) / self.interval)
+                else:
+                    self._tokens = self.burst
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) * self.interval
+            time.sleep(wait)
+
+
+class ResponseCache:
+    """
+    On-disk cache of HTTP response bodies with their validators (ETag / Last-Modified).
+    One JSON file per key; writes are atomic so concurrent processes can share the directory.
+    """
+
+    def __init__(self, directory=DEFAULT_HTTP_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def set(self, key, entry):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+
+
+class CachedHttpClient:
+    """
+    Pooled, rate-limited HTTP client with retries and a conditional on-disk cache.
+
+    Cached bodies younger than `max_age` seconds are returned without touching the network;
+    older ones are revalidated with If-None-Match / If-Modified-Since.
+    """
+
+    def __init__(self, cache=None, rate_limiter=None, max_age=6 * 3600, timeout=(5, 30), max_retries=3, pool_size=10):
+        self.cache = ResponseCache() if cache is None else cache
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.max_age = max_age
+        self.timeout = timeout
+
+        retry = Retry(
+            total=max_retries,
+            backoff_factor=3,  # arXiv asks for at least 3 seconds between requests
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def get_text(self, url, params=None, cache_key=None):
+        """
+        Returns the response body for a GET request, or None if the request failed.
+        `cache_key` defaults to the full request URL.
+        """
+        if cache_key is None:
+            cache_key = requests.Request("GET", url, params=params).prepare().url
+
+        entry = self.cache.get(cache_key) if self.cache else None
+        if entry and time.time() - entry["fetched_at"] < self.max_age:
+            metrics.increment("http_cache_hits")
+            return entry["body"]
+        metrics.increment("http_cache_misses")
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        self.rate_limiter.acquire()
+        try:
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            # Serve a stale copy rather than nothing when the network fails
+            return entry["body"] if entry else None
+
+        if response.status_code == 304 and entry:
+            metrics.increment("http_cache_revalidated")
+            entry["fetched_at"] = time.time()
+            self.cache.set(cache_key, entry)
+            return entry["body"]
+        if response.status_code != 200:
+            return entry["body"] if entry else None
+
+        if self.cache:
+            self.cache.set(cache_key, {
+                "body": response.text,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            })
+        return response.text
+
+    @contextmanager
+    def stream(self, url, params=None):
+        """
+        Yields the body of a GET request as a binary file object read straight off the socket,
+        for parsing large responses incrementally. Streamed bodies are not cached.
+        Raises requests.RequestException if the request fails.
+        """
+        self.rate_limiter.acquire()
+        response = self.session.get(url, params=params, timeout=self.timeout, stream=True)
+        try:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            yield response.raw
+        finally:
+            response.close()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client():
+    """Returns the process-wide CachedHttpClient, creating it on first use."""
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            # arXiv allows one request every 3 seconds; expanded topics are still fetched
+            # concurrently, so cached topics return at once while uncached ones queue here
+            _shared_client = CachedHttpClient(rate_limiter=RateLimiter(interval=3.0, burst=1))
+        return _shared_client
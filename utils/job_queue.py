@@ -0,0 +1,210 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.metrics import metrics
+from utils.storage import SQLiteStore, cache_path
+
+DEFAULT_JOBS_PATH = cache_path("jobs.sqlite3", "REGENAI_JOBS_DB")
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+ACTIVE_STATUSES = (QUEUED, RUNNING)
+
+# Each queue refreshes the heartbeat of its active jobs this often; active jobs whose
+# heartbeat is older than HEARTBEAT_TIMEOUT belong to a queue that is gone
+HEARTBEAT_INTERVAL = 10.0
+HEARTBEAT_TIMEOUT = 60.0
+
+
+class JobCancelled(Exception):
+    """Raised inside a job's progress callback once cancellation was requested."""
+
+
+class JobQueue(SQLiteStore):
+    """
+    Persistent queue of long-running pipeline jobs executed by a local worker pool.
+
+    Jobs are registered callables (`register(kind, fn)`) submitted with JSON parameters.
+    The job id is derived from the kind and parameters, so submitting the same inputs while
+    a job is queued, running or done returns the existing job instead of computing it again.
+    Status, progress, partial results and the final result live in SQLite, so they survive
+    Streamlit reruns and are visible to every page and session. At most `max_workers` jobs
+    run at once. Every queue owns the jobs it runs and keeps their heartbeat fresh, so jobs
+    interrupted by a server restart are re-queued when their kind is registered again, while
+    jobs still running in another live queue (another process, or an earlier instance in
+    this one) are left alone.
+
+    A job function is called as `fn(**params, progress=progress)`, and its spans go to the
+    metrics trace named by the job id. `progress(fraction, message=None, partial=None)`
+    records progress and raises JobCancelled once the job was cancelled, so cancellation
+    takes effect at the job's next progress report.
+    """
+
+    def __init__(self, path=DEFAULT_JOBS_PATH, max_workers=2):
+        super().__init__(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, params TEXT NOT NULL, status TEXT NOT NULL,"
+            " progress REAL NOT NULL DEFAULT 0, message TEXT, partial TEXT, result TEXT, error TEXT,"
+            " cancel_requested INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, updated_at REAL NOT NULL,"
+            " owner TEXT, heartbeat_at REAL)"
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("heartbeat_at", "REAL")):  # Databases from older versions
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.commit()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._handlers = {}
+        self.owner = uuid.uuid4().hex
+        self._closed = threading.Event()
+        threading.Thread(target=self._heartbeat, daemon=True, name="job-heartbeat").start()
+
+    @staticmethod
+    def make_id(kind, params):
+        """Returns the id shared by every job of `kind` with these parameters."""
+        payload = json.dumps([kind, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def register(self, kind, fn):
+        """Registers the function run for jobs of `kind` and takes over interrupted ones."""
+        self._handlers[kind] = fn
+        now = time.time()
+        with self._lock:
+            # Claimed in one statement, so two queues never take over the same job
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, heartbeat_at = ?, updated_at = ?"
+                " WHERE kind = ? AND status IN (?, ?) AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (QUEUED, self.owner, now, now, kind, QUEUED, RUNNING, now - HEARTBEAT_TIMEOUT),
+            )
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND status = ? AND owner = ?", (kind, QUEUED, self.owner)
+            ).fetchall()
+        for (job_id,) in rows:
+            self._pool.submit(self._run, job_id)
+        return self
+
+    def submit(self, kind, params, max_age=None):
+        """
+        Queues a job and returns its id. An existing job with the same inputs is reused unless
+        it failed, was cancelled, finished more than `max_age` seconds ago or was left behind
+        by a queue that is gone.
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        job_id = self.make_id(kind, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT status, updated_at, heartbeat_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row:
+                status, updated_at, heartbeat_at = row
+                if status in ACTIVE_STATUSES and (heartbeat_at or 0) >= now - HEARTBEAT_TIMEOUT:
+                    return job_id
+                if status == DONE and (max_age is None or now - updated_at < max_age):
+                    return job_id
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, kind, params, status, progress, message, partial, result, error,"
+                " cancel_requested, created_at, updated_at, owner, heartbeat_at)"
+                " VALUES (?, ?, ?, ?, 0, NULL, NULL, NULL, NULL, 0, ?, ?, ?, ?)",
+                (job_id, kind, json.dumps(params), QUEUED, now, now, self.owner, now),
+            )
+            self._conn.commit()
+        self._pool.submit(self._run, job_id)
+        return job_id
+
+    def get(self, job_id):
+        """Returns the job as a dict (status, progress, message, partial, result, error, ...) or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, params, status, progress, message, partial, result, error, created_at, updated_at"
+                " FROM jobs WHERE id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(("id", "kind", "params", "status", "progress", "message", "partial", "result", "error",
+                        "created_at", "updated_at"), row))
+        for field in ("params", "partial", "result"):
+            job[field] = json.loads(job[field]) if job[field] is not None else None
+        return job
+
+    def cancel(self, job_id):
+        """Cancels a queued job right away, or asks a running job to stop at its next progress report."""
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,))
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ? AND status = ?",
+                (CANCELLED, time.time(), job_id, QUEUED),
+            )
+            self._conn.commit()
+
+    def close(self):
+        """
+        Stops the heartbeat and the worker pool. Jobs already running finish; queued ones stay
+        in the database and are taken over by the next queue once their heartbeat expires.
+        """
+        self._closed.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _update(self, job_id, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self._conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+        self._conn.commit()
+
+    def _heartbeat(self):
+        while not self._closed.wait(HEARTBEAT_INTERVAL):
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+                    (time.time(), self.owner, QUEUED, RUNNING),
+                )
+                self._conn.commit()
+
+    def _cancel_requested(self, job_id):
+        row = self._conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def _run(self, job_id):
+        with self._lock:
+            claimed = self._conn.execute(
+                "UPDATE jobs SET status = ?, message = ?, updated_at = ? WHERE id = ? AND status = ? AND owner = ?",
+                (RUNNING, "Starting...", time.time(), job_id, QUEUED, self.owner),
+            ).rowcount
+            self._conn.commit()
+            if not claimed:
+                return  # Cancelled while queued, or taken over by another queue
+            kind, params = self._conn.execute("SELECT kind, params FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+        def progress(fraction, message=None, partial=None):
+            with self._lock:
+                if self._cancel_requested(job_id):
+                    raise JobCancelled()
+                fields = {"progress": max(0.0, min(1.0, fraction))}
+                if message is not None:
+                    fields["message"] = message
+                if partial is not None:
+                    fields["partial"] = json.dumps(partial)
+                self._update(job_id, **fields)
+
+        try:
+            # The job id doubles as the trace id of the job's spans
+            with metrics.traced(metrics.start_trace(job_id)):
+                result = self._handlers[kind](**json.loads(params), progress=progress)
+        except JobCancelled:
+            with self._lock:
+                self._update(job_id, status=CANCELLED, message="Cancelled")
+            return
+        except Exception as e:
+            with self._lock:
+                self._update(job_id, status=FAILED, error=f"{type(e).__name__}: {e}")
+            return
+        with self._lock:
+            self._update(job_id, status=DONE, progress=1.0, message="Done", result=json.dumps(result))
+
@@ -0,0 +1,91 @@
+import hashlib
+import json
+import time
+
+from utils.storage import SQLiteStore, cache_path
+
+DEFAULT_CACHE_PATH = cache_path("llm_cache.sqlite3", "REGENAI_LLM_CACHE")
+
+
+class LLMResponseCache(SQLiteStore):
+    """
+    Content-addressed cache of agent replies backed by SQLite.
+
+    Entries are keyed by a hash of (agent name, system message, model, messages),
+    expire after `ttl` seconds and are evicted least-recently-used first once
+    more than `max_entries` are stored.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=7 * 24 * 3600, max_entries=5000):
+        super().__init__(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " content TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_access REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(agent_name, system_message, model, messages):
+        """Returns the cache key for a request."""
+        payload = json.dumps([agent_name, system_message, model, messages], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached content for `key`, or None on a miss or expired entry."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, content):
+        """Stores `content` under `key` and evicts the least recently used entries if needed."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, content, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, content, now, now),
+            )
+            if self.max_entries is not None:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+            self._conn.commit()
+
+    def clear(self):
+        """Removes every entry and resets the hit/miss counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Returns hit/miss counters and the current number of entries."""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,157 @@
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+# Priority classes: lower runs first
+INTERACTIVE = 0
+BACKGROUND = 10
+
+
+class TokenBucket:
+    """Token bucket holding up to `capacity` tokens, refilled continuously at `capacity` per `period` seconds."""
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` tokens are available (0 if they are now). Requests larger than the bucket wait for a full bucket."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self._tokens >= amount else (amount - self._tokens) / self.rate
+
+    def consume(self, amount):
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+
+
+def is_rate_limit_error(exc):
+    """True for HTTP 429 / rate-limit errors raised by Groq, OpenAI-style clients or the mock backend."""
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or "ratelimit" in type(exc).__name__.lower() or "rate limit" in str(exc).lower()
+
+
+def is_retryable_error(exc):
+    """Rate limits, timeouts, connection errors and 5xx responses are worth retrying."""
+    if is_rate_limit_error(exc):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    name = type(exc).__name__.lower()
+    return (status is not None and status >= 500) or "timeout" in name or "connection" in name
+
+
+class LLMScheduler:
+    """
+    Central gate for LLM requests shared by ResearchAgents and every page.
+
+    Requests wait for request-per-minute and token-per-minute budgets, served strictly by
+    priority (INTERACTIVE before BACKGROUND) and then arrival order. Retryable failures are
+    retried with exponential backoff and full jitter, and identical requests already in
+    flight share one call.
+    """
+
+    def __init__(self, requests_per_minute=30, tokens_per_minute=12000, max_retries=4, base_delay=1.0, max_delay=30.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._in_flight = {}
+        self._in_flight_lock = threading.Lock()
+
+    def acquire(self, tokens, priority=BACKGROUND):
+        """Blocks until this request is first in line and both budgets allow it, then spends them."""
+        ticket = (priority, next(self._seq))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    if self._waiting[0] == ticket:
+                        wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                        if wait == 0:
+                            self.requests.consume(1)
+                            self.tokens.consume(tokens)
+                            return
+                    else:
+                        wait = None  # Woken when the head of the line changes
+                    self._cond.wait(timeout=wait)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff delay for retry `attempt` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn, tokens=1, priority=BACKGROUND, key=None):
+        """
+        Runs `fn()` under the rate limits and returns its result, retrying retryable errors.
+        Concurrent calls with the same `key` are coalesced into one request.
+        """
+        if key is not None:
+            with self._in_flight_lock:
+                shared = self._in_flight.get(key)
+                if shared is None:
+                    shared = self._in_flight[key] = Future()
+                    owner = True
+                else:
+                    owner = False
+            if not owner:
+                return shared.result()
+
+        try:
+            result = self._call_with_retries(fn, tokens, priority)
+        except BaseException as e:
+            if key is not None:
+                shared.set_exception(e)
+                self._release(key)
+            raise
+        if key is not None:
+            shared.set_result(result)
+            self._release(key)
+        return result
+
+    def _release(self, key):
+        with self._in_flight_lock:
+            self._in_flight.pop(key, None)
+
+    def _call_with_retries(self, fn, tokens, priority):
+        for attempt in range(self.max_retries + 1):
+            self.acquire(tokens, priority)
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable_error(e):
+                    raise
+                time.sleep(self.backoff(attempt))
+
+
+_shared_scheduler = None
+_shared_scheduler_lock = threading.Lock()
+
+
+def get_shared_scheduler():
+    """Returns the process-wide scheduler, sized by REGENAI_LLM_RPM / REGENAI_LLM_TPM (Groq free-tier defaults)."""
+    global _shared_scheduler
+    with _shared_scheduler_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = LLMScheduler(
+                requests_per_minute=int(os.getenv("REGENAI_LLM_RPM", "30")),
+                tokens_per_minute=int(os.getenv("REGENAI_LLM_TPM", "12000")),
+            )
+        return _shared_scheduler
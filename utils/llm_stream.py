@@ -0,0 +1,20 @@
+from groq import Groq
+
+
+class GroqStreamClient:
+    """Streams chat completions from Groq, yielding text chunks as they arrive."""
+
+    def __init__(self, api_key, model="llama-3.3-70b-versatile"):
+        self.model = model
+        self.client = Groq(api_key=api_key)
+
+    def stream(self, system_message, messages):
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "system", "content": system_message}, *messages],
+            stream=True,
+        )
+        for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
@@ -0,0 +1,165 @@
+import contextvars
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from contextlib import contextmanager
+
+# Latency samples kept per stage for percentile estimates, spans kept per trace and traces kept
+MAX_SAMPLES = 1000
+MAX_TRACE_SPANS = 2000
+MAX_TRACES = 200
+
+
+def _percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Metrics:
+    """
+    In-process tracing and metrics registry.
+
+    `span(stage)` times a block and records its latency; counters track token counts and
+    cache hits/misses. Spans opened on the same thread nest. Work for one query or job runs
+    inside `traced(trace_id)`, and its spans are also appended to that trace (see
+    `start_trace`), so the query's own breakdown can be shown while others run concurrently.
+    Functions handed to worker threads keep the caller's trace when wrapped with `in_trace`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+        self._counts = defaultdict(int)
+        self._totals = defaultdict(float)
+        self.counters = defaultdict(float)
+        self._local = threading.local()
+        self._traces = OrderedDict()
+        self._current_trace = contextvars.ContextVar("trace_id", default=None)
+
+    @contextmanager
+    def span(self, stage, **attributes):
+        """Times the enclosed block as one occurrence of `stage`."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        parent = stack[-1] if stack else None
+        stack.append(stage)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stack.pop()
+            self.observe(stage, time.perf_counter() - start, parent=parent, **attributes)
+
+    def observe(self, stage, seconds, parent=None, **attributes):
+        """Records one latency sample for `stage`; used directly for work that cannot be wrapped in a span."""
+        with self._lock:
+            self._latencies[stage].append(seconds)
+            self._counts[stage] += 1
+            self._totals[stage] += seconds
+            trace = self._traces.get(self._current_trace.get())
+            if trace is not None:
+                trace.append({"stage": stage, "parent": parent, "seconds": seconds, **attributes})
+
+    def increment(self, name, amount=1):
+        with self._lock:
+            self.counters[name] += amount
+
+    def start_trace(self, trace_id=None):
+        """
+        Starts an empty trace (e.g. for one query or job) and returns its id, a new one unless
+        `trace_id` is given. Only the most recent MAX_TRACES traces are kept.
+        """
+        trace_id = trace_id or uuid.uuid4().hex[:16]
+        with self._lock:
+            self._traces.pop(trace_id, None)
+            self._traces[trace_id] = deque(maxlen=MAX_TRACE_SPANS)
+            while len(self._traces) > MAX_TRACES:
+                self._traces.popitem(last=False)
+        return trace_id
+
+    @contextmanager
+    def traced(self, trace_id):
+        """Records the spans of the enclosed block, on this thread, into trace `trace_id`."""
+        token = self._current_trace.set(trace_id)
+        try:
+            yield
+        finally:
+            self._current_trace.reset(token)
+
+    def in_trace(self, fn):
+        """Wraps `fn` so that, run on another thread, its spans go to the caller's current trace."""
+        trace_id = self._current_trace.get()
+        if trace_id is None:
+            return fn
+
+        def run(*args, **kwargs):
+            with self.traced(trace_id):
+                return fn(*args, **kwargs)
+        return run
+
+    def trace(self, trace_id):
+        """Returns the spans recorded for `trace_id` (empty if unknown or evicted)."""
+        with self._lock:
+            return list(self._traces.get(trace_id) or [])
+
+    def snapshot(self):
+        """Returns per-stage count, total, p50 and p95 latency, plus counters and derived cache hit rates."""
+        with self._lock:
+            stages = {}
+            for stage, samples in self._latencies.items():
+                ordered = sorted(samples)
+                stages[stage] = {
+                    "count": self._counts[stage],
+                    "total_seconds": self._totals[stage],
+                    "p50_seconds": _percentile(ordered, 0.50),
+                    "p95_seconds": _percentile(ordered, 0.95),
+                }
+            counters = dict(self.counters)
+        hit_rates = {}
+        for name in counters:
+            if name.endswith("_cache_hits"):
+                prefix = name[: -len("_hits")]
+                lookups = counters[name] + counters.get(f"{prefix}_misses", 0)
+                hit_rates[prefix] = counters[name] / lookups if lookups else 0.0
+        return {"stages": stages, "counters": counters, "cache_hit_rates": hit_rates}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2, sort_keys=True)
+
+    def to_prometheus(self):
+        """Renders the snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            "# TYPE regenai_stage_latency_seconds summary",
+        ]
+        for stage, stats in sorted(snapshot["stages"].items()):
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            lines.append(f'regenai_stage_latency_seconds{{stage="{label}",quantile="0.5"}} {stats["p50_seconds"]:.6f}')
+            lines.append(f'regenai_stage_latency_seconds{{stage="{label}",quantile="0.95"}} {stats["p95_seconds"]:.6f}')
+            lines.append(f'regenai_stage_latency_seconds_sum{{stage="{label}"}} {stats["total_seconds"]:.6f}')
+            lines.append(f'regenai_stage_latency_seconds_count{{stage="{label}"}} {stats["count"]}')
+        lines.append("# TYPE regenai_counter_total counter")
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f'regenai_counter_total{{name="{name}"}} {value:g}')
+        lines.append("# TYPE regenai_cache_hit_ratio gauge")
+        for name, value in sorted(snapshot["cache_hit_rates"].items()):
+            lines.append(f'regenai_cache_hit_ratio{{cache="{name}"}} {value:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self._counts.clear()
+            self._totals.clear()
+            self.counters.clear()
+            self._traces.clear()
+
+
+# Process-wide registry used by agents, loaders and the graph builder
+metrics = Metrics()
+
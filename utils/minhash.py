@@ -0,0 +1,51 @@
+import re
+import zlib
+
+import numpy as np
+
+_PRIME = (1 << 31) - 1
+
+
+def shingles(text, size=3):
+    """Returns the set of `size`-word shingles of `text` (lowercased, punctuation ignored)."""
+    words = re.findall(r"[a-z0-9]+", (text or "").lower())
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+class MinHasher:
+    """
+    MinHash signatures for estimating the Jaccard similarity of shingle sets, with LSH band
+    keys so near-duplicate candidates are found without comparing every pair.
+
+    With `bands` bands of `num_perm / bands` rows, pairs above roughly
+    (1 / bands) ** (bands / num_perm) similarity share at least one band key.
+    Sets smaller than `min_shingles` (e.g. placeholder abstracts) get no signature.
+    """
+
+    def __init__(self, num_perm=64, bands=16, min_shingles=8, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        # a * crc32 + b stays below 2**63, so the universal hash never overflows int64
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.int64)
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.int64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.min_shingles = min_shingles
+
+    def signature(self, shingle_set):
+        """Returns the MinHash signature of a shingle set, or None if the set is too small."""
+        if len(shingle_set) < self.min_shingles:
+            return None
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingle_set), dtype=np.int64, count=len(shingle_set)
+        )
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+    @staticmethod
+    def similarity(first, second):
+        """Estimated Jaccard similarity of the sets behind two signatures."""
+        return float(np.mean(first == second))
+
+    def band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
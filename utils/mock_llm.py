@@ -0,0 +1,106 @@
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import deque
+
+
+class MockRateLimitError(Exception):
+    """Raised by MockLLM when a configured rate limit is exceeded, like a Groq HTTP 429."""
+    status_code = 429
+
+
+class MockLLM:
+    """
+    Deterministic offline stand-in for the Groq backend.
+
+    Replies are canned text derived from the prompt (or a fixed `reply`), streamed
+    word by word with an optional per-token delay, so streaming pages and tests
+    can run without network access or an API key. With `requests_per_minute` or
+    `tokens_per_minute` set it enforces a sliding one-minute window and raises
+    MockRateLimitError when a request would exceed it.
+    """
+
+    def __init__(self, reply=None, token_delay=0.0, first_token_delay=0.0, requests_per_minute=None, tokens_per_minute=None):
+        self.reply = reply
+        self.token_delay = token_delay
+        self.first_token_delay = first_token_delay
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.calls = 0
+        self.rejected = 0
+        self._window = deque()  # (timestamp, tokens) of accepted requests
+        self._lock = threading.Lock()
+
+    def _admit(self, system_message, messages):
+        if self.requests_per_minute is None and self.tokens_per_minute is None:
+            return
+        tokens = sum(len(m["content"]) // 4 for m in messages) + len(system_message or "") // 4
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0][0] >= 60:
+                self._window.popleft()
+            over_requests = self.requests_per_minute is not None and len(self._window) >= self.requests_per_minute
+            over_tokens = self.tokens_per_minute is not None and sum(t for _, t in self._window) + tokens > self.tokens_per_minute
+            if over_requests or over_tokens:
+                self.rejected += 1
+                raise MockRateLimitError("Rate limit reached, please retry later")
+            self._window.append((now, tokens))
+
+    def render_reply(self, system_message, messages):
+        """Returns the full canned reply for a request."""
+        if self.reply is not None:
+            return self.reply
+        prompt = messages[-1]["content"] if messages else ""
+        digest = hashlib.sha256(f"{system_message}\n{prompt}".encode("utf-8")).hexdigest()[:8]
+        paper_ids = re.findall(r"^\[(p\d+)\]$", prompt, re.M)
+        if paper_ids and "JSON object" in prompt:
+            # Follow the batched summarization protocol (see ResearchAgents.summarize_papers)
+            return json.dumps({paper_id: f"Mock summary {digest} of {paper_id}." for paper_id in paper_ids})
+        return f"Mock response {digest}: " + " ".join(prompt.split()[:40])
+
+    def stream(self, system_message, messages):
+        self._admit(system_message, messages)
+        self.calls += 1
+        if self.first_token_delay:
+            time.sleep(self.first_token_delay)
+        words = self.render_reply(system_message, messages).split(" ")
+        for i, word in enumerate(words):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield word if i == 0 else " " + word
+
+    def complete(self, system_message, messages):
+        return "".join(self.stream(system_message, messages))
+
+
+class MockAssistantAgent:
+    """
+    Drop-in stand-in for autogen's AssistantAgent backed by MockLLM, for offline runs and
+    benchmarks: ResearchAgents(api_key, agent_cls=MockAssistantAgent). Latency is
+    `latency` seconds before the first token plus 1 / `tokens_per_second` per token.
+
+    Groq applies one rate limit per API key to every agent, so agents meant to share a limit
+    should share one backend, also used for streaming:
+
+        llm = MockLLM(requests_per_minute=30, tokens_per_minute=6000)
+        ResearchAgents("mock", stream_client=llm, agent_cls=MockAssistantAgent, agent_kwargs={"llm": llm})
+
+    Without `llm`, each agent gets its own MockLLM built from the latency and limit arguments.
+    """
+
+    def __init__(self, name, system_message="", llm_config=None, latency=0.0, tokens_per_second=None,
+                 requests_per_minute=None, tokens_per_minute=None, llm=None, **kwargs):
+        self.name = name
+        self.system_message = system_message
+        self.llm_config = llm_config
+        self.llm = llm or MockLLM(
+            first_token_delay=latency,
+            token_delay=1.0 / tokens_per_second if tokens_per_second else 0.0,
+            requests_per_minute=requests_per_minute,
+            tokens_per_minute=tokens_per_minute,
+        )
+
+    def generate_reply(self, messages=None, **kwargs):
+        return {"content": self.llm.complete(self.system_message, messages or []), "role": "assistant"}
@@ -0,0 +1,63 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from utils.storage import SQLiteStore, cache_path
+
+DEFAULT_HANDLES_PATH = cache_path("paper_handles.sqlite3", "REGENAI_HANDLES_DB")
+
+
+class PaperHandleStore(SQLiteStore):
+    """
+    Maps short paper handles to paper records so links carry an id instead of the paper text.
+
+    Records are kept in an in-process LRU in front of a SQLite table, so any page or server
+    process sharing the cache directory can resolve a handle.
+    """
+
+    def __init__(self, path=DEFAULT_HANDLES_PATH, memory_size=256):
+        super().__init__(path)
+        self.memory_size = memory_size
+        self._memory = OrderedDict()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS handles (handle TEXT PRIMARY KEY, record TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_handle(record):
+        """Returns a 12-character handle derived from the record's id, or its link and title."""
+        key = record.get("id") or f"{record.get('link')}|{record.get('title')}"
+        return hashlib.sha1(key.encode("utf-8")).hexdigest()[:12]
+
+    def _remember(self, handle, record):
+        self._memory[handle] = record
+        self._memory.move_to_end(handle)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def put(self, record):
+        """Stores `record` (title, summary, advantages_disadvantages, ...) and returns its handle."""
+        handle = self.make_handle(record)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO handles (handle, record, created_at) VALUES (?, ?, ?)",
+                (handle, json.dumps(record, ensure_ascii=False), time.time()),
+            )
+            self._conn.commit()
+            self._remember(handle, record)
+        return handle
+
+    def get(self, handle):
+        """Returns the record for `handle`, or None if it is unknown."""
+        with self._lock:
+            if handle in self._memory:
+                self._memory.move_to_end(handle)
+                return self._memory[handle]
+            row = self._conn.execute("SELECT record FROM handles WHERE handle = ?", (handle,)).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row[0])
+            self._remember(handle, record)
+            return record
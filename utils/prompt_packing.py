@@ -0,0 +1,107 @@
+from functools import lru_cache
+
+# Tokens below which a per-paper section is no longer worth sending on its own;
+# sets that cannot fit at this size are split into map-reduce batches instead
+MIN_SECTION_TOKENS = 150
+
+
+@lru_cache(maxsize=1)
+def _get_tokenizer():
+    """Loads the GPT-2 tokenizer (as LangChain's get_token_ids does), or None when unavailable offline."""
+    try:
+        from transformers import GPT2TokenizerFast
+        return GPT2TokenizerFast.from_pretrained("gpt2")
+    except Exception:
+        return None
+
+
+def count_tokens(text):
+    """Counts tokens in `text`, approximating 4 characters per token without a tokenizer."""
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return (len(text) + 3) // 4
+    return len(tokenizer.encode(text))
+
+
+def truncate_to_tokens(text, max_tokens):
+    """Cuts `text` down to at most `max_tokens` tokens, marking the cut with an ellipsis."""
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        if len(text) <= max_tokens * 4:
+            return text
+        return text[: max(0, max_tokens * 4 - 1)].rstrip() + "…"
+    ids = tokenizer.encode(text)
+    if len(ids) <= max_tokens:
+        return text
+    return tokenizer.decode(ids[: max(0, max_tokens - 1)]).rstrip() + "…"
+
+
+def pack_sections(sections, budget, min_tokens=MIN_SECTION_TOKENS):
+    """
+    Fits `sections` into `budget` tokens by trimming the longest sections first, so short
+    sections are sent whole and long ones share what is left equally.
+
+    Returns:
+        list: The (possibly truncated) sections, or None when even `min_tokens` per section
+        does not fit and the caller should batch instead.
+    """
+    sizes = [count_tokens(section) for section in sections]
+    if sum(sizes) <= budget:
+        return list(sections)
+    if len(sections) * min_tokens > budget:
+        return None
+
+    # Find the largest per-section cap that keeps the total within budget
+    remaining, cap = budget, 0
+    ordered = sorted(sizes)
+    for i, size in enumerate(ordered):
+        share = remaining // (len(ordered) - i)
+        if size > share:
+            cap = share
+            break
+        remaining -= size
+    return [truncate_to_tokens(section, cap) if size > cap else section for section, size in zip(sections, sizes)]
+
+
+def batch_sections(sections, budget, min_tokens=MIN_SECTION_TOKENS):
+    """
+    Splits `sections` into consecutive batches that each fit `budget` tokens, trimming any
+    section larger than `max(min_tokens, budget // 4)` so it can share a batch.
+
+    Returns:
+        list: Batches, each a list of sections.
+    """
+    per_section = max(min_tokens, budget // 4)
+    batches, current, used = [], [], 0
+    for section in sections:
+        section = truncate_to_tokens(section, per_section)
+        size = count_tokens(section)
+        if current and used + size > budget:
+            batches.append(current)
+            current, used = [], 0
+        current.append(section)
+        used += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def plan_batches(sections, budget, max_items=None):
+    """
+    Groups consecutive sections into batches that each fit `budget` tokens and hold at most
+    `max_items` sections. A single section larger than the budget gets a batch of its own.
+
+    Returns:
+        list: Batches as lists of section indices.
+    """
+    batches, current, used = [], [], 0
+    for i, section in enumerate(sections):
+        size = count_tokens(section)
+        if current and (used + size > budget or (max_items and len(current) >= max_items)):
+            batches.append(current)
+            current, used = [], 0
+        current.append(i)
+        used += size
+    if current:
+        batches.append(current)
+    return batches
@@ -0,0 +1,82 @@
+import queue
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.metrics import metrics
+
+
+class RolePanel:
+    """
+    Small DAG executor for multi-agent role panels.
+
+    Each role is a callable receiving a dict of its dependencies' results. Roles whose
+    dependencies are satisfied run concurrently; only real dependencies are serialized.
+    A role added with `stream=True` returns an iterable of text chunks (e.g. from
+    ResearchAgents.stream_agent); its result is the joined text, and `stream()` reports the
+    text so far while it arrives.
+    """
+
+    def __init__(self, max_workers=6, poll_interval=0.05):
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval  # How often stream() checks for new chunks
+        self._roles = {}
+
+    def add(self, name, fn, depends_on=(), stream=False):
+        """Registers role `name`; `fn(results)` gets {dependency name: result}."""
+        if name in self._roles:
+            raise ValueError(f"Role '{name}' is already registered")
+        self._roles[name] = (fn, tuple(depends_on), stream)
+        return self
+
+    def run(self):
+        """Runs every role and yields (name, result) pairs in completion order."""
+        for name, text, done in self.stream():
+            if done:
+                yield name, text
+
+    def stream(self):
+        """
+        Runs every role and yields (name, text, done) events on the calling thread: the text
+        so far for streaming roles as chunks arrive (done=False), and each role's result once
+        it finishes (done=True), in completion order.
+        """
+        for name, (_, deps, _) in self._roles.items():
+            missing = [dep for dep in deps if dep not in self._roles]
+            if missing:
+                raise ValueError(f"Role '{name}' depends on unknown roles: {', '.join(missing)}")
+
+        chunks = queue.Queue()
+
+        @metrics.in_trace  # Roles record their spans in the caller's trace
+        def call(name, fn, streaming, args):
+            if not streaming:
+                return fn(args)
+            text = ""
+            for chunk in fn(args):
+                text += chunk
+                chunks.put((name, text))
+            return text
+
+        def drain():
+            while True:
+                try:
+                    name, text = chunks.get_nowait()
+                except queue.Empty:
+                    return
+                yield name, text, False
+
+        results, pending, running = {}, dict(self._roles), {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name, (fn, deps, streaming) in list(pending.items()):
+                    if all(dep in results for dep in deps):
+                        del pending[name]
+                        running[pool.submit(call, name, fn, streaming, {dep: results[dep] for dep in deps})] = name
+                if not running:
+                    raise ValueError(f"Dependency cycle between roles: {', '.join(pending)}")
+
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                yield from drain()  # A role's chunks are all queued before it completes
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+                    yield name, results[name], True
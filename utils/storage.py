@@ -0,0 +1,26 @@
+import os
+import sqlite3
+import threading
+
+# On-disk caches and stores, shared by every process started from this checkout
+CACHE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache")
+
+
+def cache_path(name, env_var):
+    """Returns the path of cache file or directory `name`: `env_var` if set, else `name` under CACHE_ROOT."""
+    return os.getenv(env_var, os.path.join(CACHE_ROOT, name))
+
+
+class SQLiteStore:
+    """
+    Base for the SQLite-backed stores. Opens `path` (":memory:" for a private in-memory
+    database), creating its directory, as one connection shared by every thread; callers
+    serialize access with `self._lock`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
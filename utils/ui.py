@@ -0,0 +1,86 @@
+"""
+Streamlit widgets shared by the app's pages, kept here so that agents, loaders and the
+pipeline import without Streamlit.
+"""
+from collections import defaultdict
+
+import streamlit as st
+
+from utils.job_queue import ACTIVE_STATUSES
+from utils.metrics import metrics
+
+
+def render_metrics_sidebar(trace_id=None):
+    """Shows a query's stage breakdown (trace `trace_id`) and overall latency/caching stats in the sidebar."""
+    snapshot = metrics.snapshot()
+    with st.sidebar.expander("⏱️ Performance"):
+        trace = metrics.trace(trace_id) if trace_id else []
+        if trace:
+            st.markdown("**This query**")
+            totals = defaultdict(float)
+            for span in trace:
+                totals[span["stage"]] += span["seconds"]
+            st.table([{"stage": stage, "seconds": round(seconds, 3)} for stage, seconds in sorted(totals.items(), key=lambda item: -item[1])])
+        if snapshot["stages"]:
+            st.markdown("**All queries**")
+            st.table([
+                {"stage": stage, "calls": stats["count"], "p50 (s)": round(stats["p50_seconds"], 3), "p95 (s)": round(stats["p95_seconds"], 3)}
+                for stage, stats in sorted(snapshot["stages"].items())
+            ])
+        counters = snapshot["counters"]
+        if counters.get("prompt_tokens") or counters.get("completion_tokens"):
+            st.markdown(f"**Tokens:** {int(counters.get('prompt_tokens', 0))} prompt / {int(counters.get('completion_tokens', 0))} completion")
+        for cache, rate in sorted(snapshot["cache_hit_rates"].items()):
+            st.markdown(f"**{cache.replace('_', ' ')} hit rate:** {rate:.0%}")
+        st.download_button("Export metrics (JSON)", metrics.to_json(), file_name="regenai_metrics.json", mime="application/json")
+
+
+def remember_papers(paper_ids):
+    """Puts papers at the front of this session's recent papers, offered on every page."""
+    recent = [pid for pid in st.session_state.get("recent_paper_ids", []) if pid not in paper_ids]
+    st.session_state["recent_paper_ids"] = (list(paper_ids) + recent)[:50]
+
+
+def recent_paper_ids():
+    return st.session_state.get("recent_paper_ids", [])
+
+
+def render_job_progress(queue, job_id, render_partial=None, interval=1.0):
+    """
+    Shows a job's progress bar, partial results (via `render_partial(partial)`) and a cancel
+    button, refreshing every `interval` seconds, and reruns the page once the job finishes.
+    """
+    @st.fragment(run_every=interval)
+    def poll():
+        job = queue.get(job_id)
+        if job is None or job["status"] not in ACTIVE_STATUSES:
+            st.rerun()
+        st.progress(job["progress"], text=job["message"] or "Queued...")
+        if render_partial is not None and job["partial"] is not None:
+            render_partial(job["partial"])
+        if st.button("✖ Cancel", key=f"cancel_job_{job_id}"):
+            queue.cancel(job_id)
+
+    poll()
+
+
+def render_chart(future, interval=1.0):
+    """
+    Shows a chart rendered by utils.viz_sandbox (a Future of PNG bytes) without blocking the
+    page: a placeholder is refreshed every `interval` seconds until the render finishes, and
+    then the page reruns to show it.
+    """
+    if future.done():
+        try:
+            st.image(future.result())
+        except Exception as e:
+            st.warning("⚠️ Couldn't render chart: " + str(e))
+        return
+
+    @st.fragment(run_every=interval)
+    def poll():
+        if future.done():
+            st.rerun()
+        st.caption("⏳ Rendering chart...")
+
+    poll()
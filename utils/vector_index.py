@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+
+from utils.storage import cache_path
+
+DEFAULT_INDEX_DIR = cache_path("vector_index", "REGENAI_VECTOR_INDEX")
+
+
+class HashingEmbedder:
+    """
+    Dependency-free fallback embedder: hashed word unigrams and bigrams, L2-normalized.
+    Much weaker than a sentence model, but deterministic and instant on CPU.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def encode(self, texts):
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r"[a-z0-9]+", text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = hashlib.md5(feature.encode("utf-8")).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vectors[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        return _normalize(vectors)
+
+
+class SentenceEmbedder:
+    """CPU sentence-transformers embedder; the model is loaded on first use."""
+
+    def __init__(self, model_name="all-MiniLM-L6-v2"):
+        self.model_name = model_name
+        self.name = model_name
+        self._model = None
+        self._lock = threading.Lock()
+
+    def encode(self, texts):
+        with self._lock:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.model_name, device="cpu")
+        vectors = self._model.encode(list(texts), batch_size=32, convert_to_numpy=True, show_progress_bar=False)
+        return _normalize(vectors.astype(np.float32))
+
+
+def default_embedder():
+    """Returns a SentenceEmbedder when sentence-transformers is installed, else a HashingEmbedder."""
+    try:
+        import sentence_transformers  # noqa: F401
+    except ImportError:
+        return HashingEmbedder()
+    return SentenceEmbedder()
+
+
+def _normalize(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def paper_text(paper):
+    return f"{paper.get('title') or ''}\n{paper.get('summary') or ''}"
+
+
+class PaperIndex:
+    """
+    Local vector index over fetched papers.
+
+    Vectors live in one float32 matrix saved as `vectors.npy` (memory-mapped on load) next to
+    `papers.jsonl` with each paper's id, title, summary and link. Search is exact brute-force
+    cosine similarity, or approximate via random-hyperplane LSH buckets re-ranked exactly.
+    """
+
+    def __init__(self, directory=DEFAULT_INDEX_DIR, embedder=None, lsh_bits=12, seed=0):
+        self.directory = directory
+        self.embedder = embedder or default_embedder()
+        self.lsh_bits = lsh_bits
+        self._popcount = np.array([bin(i).count("1") for i in range(1 << lsh_bits)])
+        self._seed = seed
+        self._lock = threading.Lock()
+        self._papers = []
+        self._ids = {}
+        self._vectors = None
+        self._planes = None
+        self._codes = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def __len__(self):
+        return len(self._papers)
+
+    def _embed(self, texts):
+        return self.embedder.encode(texts)
+
+    def _load(self):
+        meta_path = os.path.join(self.directory, "papers.jsonl")
+        vectors_path = os.path.join(self.directory, "vectors.npy")
+        embedder_path = os.path.join(self.directory, "embedder.txt")
+        if not all(os.path.exists(path) for path in (meta_path, vectors_path, embedder_path)):
+            self._reset_files()
+            return
+        with open(embedder_path, "r", encoding="utf-8") as f:
+            embedder_name = f.read().strip()
+        with open(meta_path, "r", encoding="utf-8") as f:
+            papers = [json.loads(line) for line in f if line.strip()]
+        vectors = np.load(vectors_path, mmap_mode="r")
+        if embedder_name != self.embedder.name or len(papers) != vectors.shape[0]:
+            # Vectors from another embedder, or an interrupted write: start a fresh index
+            self._reset_files()
+            return
+        self._papers = papers
+        self._ids = {paper["id"]: row for row, paper in enumerate(papers)}
+        self._vectors = vectors
+        self._codes = None
+
+    def _reset_files(self):
+        for name in ("papers.jsonl", "vectors.npy", "embedder.txt"):
+            path = os.path.join(self.directory, name)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _save(self, new_papers):
+        with open(os.path.join(self.directory, "embedder.txt"), "w", encoding="utf-8") as f:
+            f.write(self.embedder.name)
+        with open(os.path.join(self.directory, "papers.jsonl"), "a", encoding="utf-8") as f:
+            for paper in new_papers:
+                f.write(json.dumps(paper, ensure_ascii=False) + "\n")
+        tmp_path = os.path.join(self.directory, "vectors.tmp.npy")
+        np.save(tmp_path, np.asarray(self._vectors))
+        os.replace(tmp_path, os.path.join(self.directory, "vectors.npy"))
+
+    def add(self, papers, id_fn):
+        """Embeds and stores the papers whose id (from `id_fn(paper)`) is not indexed yet. Returns the number added."""
+        with self._lock:
+            new_papers, new_ids = [], set()
+            for paper in papers:
+                paper_id = id_fn(paper)
+                if paper_id in self._ids or paper_id in new_ids:
+                    continue
+                new_ids.add(paper_id)
+                new_papers.append({"id": paper_id, "title": paper.get("title"), "summary": paper.get("summary"), "link": paper.get("link")})
+            if not new_papers:
+                return 0
+
+            # Ids only point at rows once their vectors exist, so a failed embedding leaves the index unchanged
+            vectors = self._embed([paper_text(paper) for paper in new_papers])
+            for row, paper in enumerate(new_papers, start=len(self._papers)):
+                self._ids[paper["id"]] = row
+            self._vectors = vectors if self._vectors is None else np.vstack([self._vectors, vectors])
+            self._papers.extend(new_papers)
+            self._codes = None
+            if self.directory:
+                self._save(new_papers)
+            return len(new_papers)
+
+    def _hash_codes(self, vectors):
+        if self._planes is None:
+            rng = np.random.default_rng(self._seed)
+            self._planes = rng.standard_normal((vectors.shape[1], self.lsh_bits)).astype(np.float32)
+        bits = (vectors @ self._planes) > 0
+        return bits @ (1 << np.arange(self.lsh_bits))
+
+    def search(self, query, k=5, approximate=False, min_candidates=50):
+        """
+        Returns up to `k` (paper, score) pairs most similar to `query`.
+        With `approximate`, only rows whose LSH code is within one bit of the query's are scored,
+        falling back to brute force when that yields fewer than `min_candidates` rows.
+        """
+        with self._lock:
+            if self._vectors is None or not self._papers:
+                return []
+            vectors = self._vectors
+            query_vector = self._embed([query])[0]
+            rows = None
+            if approximate:
+                if self._codes is None:
+                    self._codes = self._hash_codes(np.asarray(vectors))
+                query_code = int(self._hash_codes(query_vector[None, :])[0])
+                distance = self._popcount[self._codes ^ query_code]
+                rows = np.flatnonzero(distance <= 1)
+                if len(rows) < min_candidates:
+                    rows = None
+
+            candidates = vectors if rows is None else vectors[rows]
+            scores = np.asarray(candidates @ query_vector)
+            top = np.argsort(-scores)[:k]
+            return [(self._papers[int(top_row if rows is None else rows[top_row])], float(scores[top_row])) for top_row in top]
+
+    def rerank(self, query, papers, top_k=None, id_fn=None):
+        """Orders `papers` by similarity to `query`, reusing stored vectors for indexed papers."""
+        if not papers:
+            return []
+        with self._lock:
+            query_vector = self._embed([query])[0]
+            rows = [self._ids.get(id_fn(paper)) if id_fn else None for paper in papers]
+            missing = [i for i, row in enumerate(rows) if row is None]
+            vectors = np.zeros((len(papers), query_vector.shape[0]), dtype=np.float32)
+            for i, row in enumerate(rows):
+                if row is not None:
+                    vectors[i] = self._vectors[row]
+            if missing:
+                vectors[missing] = self._embed([paper_text(papers[i]) for i in missing])
+        scores = vectors @ query_vector
+        order = np.argsort(-scores, kind="stable")
+        ranked = [papers[i] for i in order]
+        return ranked[:top_k] if top_k else ranked
@@ -0,0 +1,192 @@
+import hashlib
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from utils.metrics import metrics
+from utils.storage import cache_path
+
+DEFAULT_VIZ_CACHE_DIR = cache_path("viz", "REGENAI_VIZ_CACHE")
+
+# Runs in the child process as `_RUNNER cpu_seconds memory_bytes output_path`: applies the
+# resource limits, executes the snippet from stdin with the Agg backend and saves the current
+# figure to output_path as PNG. Anything the snippet prints goes to stderr.
+_RUNNER = """
+import sys
+try:
+    import resource  # POSIX only; elsewhere only the wall-clock timeout applies
+except ImportError:
+    resource = None
+cpu, memory, output = int(sys.argv[1]), int(sys.argv[2]), sys.argv[3]
+if resource is not None:
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu, cpu + 1))
+    resource.setrlimit(resource.RLIMIT_AS, (memory, memory))
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+code = sys.stdin.read()
+sys.stdout = sys.stderr
+exec(compile(code, "<visualization>", "exec"), {"__name__": "__visualization__"})
+if not plt.get_fignums():
+    sys.exit("The snippet did not draw a figure")
+plt.gcf().savefig(output, format="png", dpi=100, bbox_inches="tight")
+"""
+
+
+class VisualizationError(Exception):
+    """Raised when a visualization snippet fails, times out or exceeds its resource limits."""
+
+
+class VisualizationTimeout(VisualizationError):
+    """Raised when a snippet exceeds the wall-clock timeout; not cached, as it may pass on a quieter machine."""
+
+
+def extract_code(text):
+    """
+    Returns the Python code in an agent's visualization answer: the fenced python blocks if
+    there are any, else the text itself when it looks like matplotlib code, else None.
+    """
+    blocks = re.findall(r"```(?:python|py)?[ \t]*\n(.*?)```", text or "", re.S)
+    code = "\n".join(block for block in blocks if "plt" in block or "matplotlib" in block or "sns" in block)
+    if code:
+        return code
+    if "import matplotlib" in (text or "") or "plt." in (text or ""):
+        return text
+    return None
+
+
+class VisualizationRenderer:
+    """
+    Renders generated matplotlib/seaborn snippets to PNG outside the server process.
+
+    Each snippet runs in its own short-lived Python process with the Agg backend, a CPU-time
+    and address-space limit (on POSIX), a wall-clock timeout and a minimal environment (no
+    API keys); at most `max_workers` run at once. PNGs and failures other than timeouts are
+    cached on disk by snippet hash, so repeat renders are free and a broken snippet is not
+    retried on every rerun.
+    """
+
+    def __init__(self, max_workers=2, timeout=20.0, cpu_seconds=10, memory_mb=1024, cache_dir=DEFAULT_VIZ_CACHE_DIR):
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.cache_dir = cache_dir
+        os.makedirs(os.path.join(cache_dir, "mplconfig"), exist_ok=True)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="viz")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def snippet_hash(code):
+        return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+    def _path(self, digest, suffix):
+        return os.path.join(self.cache_dir, f"{digest}.{suffix}")
+
+    def _environment(self, workdir):
+        env = {
+            "PATH": os.environ.get("PATH", ""),
+            "HOME": workdir,
+            "MPLBACKEND": "Agg",
+            # Persistent, so matplotlib's font cache is not rebuilt for every snippet
+            "MPLCONFIGDIR": os.path.join(self.cache_dir, "mplconfig"),
+            "OPENBLAS_NUM_THREADS": "1",  # Keeps BLAS from reserving memory for a thread pool
+            "OMP_NUM_THREADS": "1",
+        }
+        if "SYSTEMROOT" in os.environ:  # Python cannot start on Windows without it
+            env["SYSTEMROOT"] = os.environ["SYSTEMROOT"]
+        return env
+
+    def _execute(self, code):
+        with tempfile.TemporaryDirectory(prefix="regenai-viz-") as workdir:  # Files the snippet writes are discarded
+            output = os.path.join(workdir, ".figure.png")
+            limits = [str(int(self.cpu_seconds)), str(int(self.memory_mb) * 1024 * 1024), output]
+            try:
+                completed = subprocess.run(
+                    [sys.executable, "-c", _RUNNER, *limits],
+                    input=code.encode("utf-8"),
+                    capture_output=True,
+                    timeout=self.timeout,
+                    cwd=workdir,
+                    env=self._environment(workdir),
+                )
+            except subprocess.TimeoutExpired:
+                raise VisualizationTimeout(f"Timed out after {self.timeout:.0f}s")
+            if completed.returncode != 0:
+                if completed.returncode < 0:
+                    raise VisualizationError(f"Stopped by signal {-completed.returncode} (CPU or memory limit exceeded)")
+                lines = completed.stderr.decode("utf-8", "replace").strip().splitlines()
+                raise VisualizationError(lines[-1] if lines else f"Exited with status {completed.returncode}")
+            try:
+                with open(output, "rb") as f:
+                    return f.read()
+            except OSError:
+                raise VisualizationError("The snippet removed its figure")
+
+    def _render(self, code, digest):
+        try:
+            with metrics.span("viz_render"):
+                png = self._execute(code)
+        except VisualizationTimeout:
+            raise
+        except VisualizationError as e:
+            with open(self._path(digest, "err"), "w", encoding="utf-8") as f:
+                f.write(str(e))
+            raise
+        tmp_path = self._path(digest, "png.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(png)
+        os.replace(tmp_path, self._path(digest, "png"))
+        return png
+
+    def _cached(self, digest):
+        try:
+            with open(self._path(digest, "png"), "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+        try:
+            with open(self._path(digest, "err"), "r", encoding="utf-8") as f:
+                return VisualizationError(f.read())
+        except OSError:
+            return None
+
+    def submit(self, code):
+        """
+        Starts rendering `code` in the background and returns a Future whose result is the
+        PNG bytes (or which raises VisualizationError). Cached snippets resolve immediately
+        and identical snippets submitted concurrently share one render.
+        """
+        digest = self.snippet_hash(code)
+        with self._lock:
+            future = self._inflight.get(digest)
+            if future is not None:
+                return future
+            cached = self._cached(digest)
+            if cached is None:
+                future = self._pool.submit(self._render, code, digest)
+                self._inflight[digest] = future
+        if cached is None:
+            metrics.increment("viz_cache_misses")
+            future.add_done_callback(lambda _: self._forget(digest))
+            return future
+
+        metrics.increment("viz_cache_hits")
+        future = Future()
+        if isinstance(cached, VisualizationError):
+            future.set_exception(cached)
+        else:
+            future.set_result(cached)
+        return future
+
+    def _forget(self, digest):
+        with self._lock:
+            self._inflight.pop(digest, None)
+
+    def render(self, code):
+        """Returns the PNG bytes for `code`, raising VisualizationError if it cannot be rendered."""
+        return self.submit(code).result()